@@ -0,0 +1,360 @@
+# autopilot.py
+"""Table-driven autopilot for the idle title screen and demos.
+
+Bird motion is deterministic: a flap sets the movement to FLAP_STRENGTH,
+every frame adds GRAVITY, and pygame rounds the new position to whole
+pixels, so the pixel step depends only on frames since the last flap.
+Pipes move round(speed) pixels a frame. A backward search over
+(bird y relative to the gap centre, velocity, frames until the pipe is
+cleared) finds, for each case, the lowest position from which not flapping
+still gets through the gap; it is stored as one int16 threshold per
+(speed, gap size, velocity, distance) in a compact binary file, one table
+for each installed pipe skin width. A pack installed after the build gets
+its table solved on a worker thread when its pipes are chosen; demos wait
+until it is ready.
+
+Each frame the autopilot looks up one threshold and flaps if the bird is
+below it, so it adds no search to the frame. The gap size is a coarse
+index as well (the gap shrinks with score independently of speed); each
+bucket is solved for its smallest gap, which is safe for any larger one.
+
+Rebuild the table after changing the physics constants:
+    python autopilot.py --build
+"""
+import argparse
+import math
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+
+from config import *
+from render import LAYER_HUD
+
+SPEEDS = (3, 4, 5, 6)  # round(current_speed) between PIPE_SPEED and MAX_PIPE_SPEED
+GAP_BUCKETS = tuple(range(MIN_PIPE_GAP, INITIAL_PIPE_GAP + 1, 20))  # Smallest gap solved in each bucket
+VELOCITY_STEPS = 96  # Frames since a flap; faster falls use the last one
+DISTANCE_STEPS = 128  # Frames until the next pipe is cleared; further pipes use the last one
+Y_RANGE = SCREEN_HEIGHT // 2  # Bird y relative to the gap centre searched, +-; leaving it counts as a crash
+SAFETY_MARGIN = 3  # Pixels kept clear of the pipes
+
+TABLE_MAGIC = b'FBAP'
+TABLE_VERSION = 3
+TABLE_HEADER = struct.Struct('<4sHIHI')  # magic, version, physics fingerprint, pipe width, data size
+
+RESUME_DELAY = FPS  # Frames a demo stays paused after a hit, to show the fog
+
+
+def physics_fingerprint(pipe_width):
+    """Checksum of everything the table was solved for."""
+    params = (GRAVITY, FLAP_STRENGTH, BIRD_SIZE, pipe_width, SPEEDS, GAP_BUCKETS,
+              VELOCITY_STEPS, DISTANCE_STEPS, Y_RANGE, SAFETY_MARGIN)
+    return zlib.crc32(repr(params).encode())
+
+
+def velocity_pixel_steps():
+    """Pixels moved on the frame after each velocity index, as step_bird computes them."""
+    movement = FLAP_STRENGTH
+    steps = [math.floor(movement + 0.5)]
+    for _ in range(VELOCITY_STEPS):
+        movement += GRAVITY
+        steps.append(math.floor(movement + 0.5))
+    return steps
+
+
+def installed_pipe_widths():
+    """Widths of every installed pipe skin, which the shipped file has tables for."""
+    from skins import SkinRegistry
+    skins = SkinRegistry()
+    return sorted({skins.pipe_size(skin.id)[0] for skin in skins.options('pipe')})
+
+
+def solve_thresholds(speed, gap, pipe_width):
+    """Flap thresholds for one speed and gap, indexed [velocity][distance].
+
+    Positions are sets of relative y held as bits of a Python int, so each
+    velocity/distance cell is a couple of shifts and masks.
+    """
+    width = 2 * Y_RANGE + 1
+    full = (1 << width) - 1
+
+    def band(low, high):
+        low, high = max(low, -Y_RANGE), min(high, Y_RANGE)
+        return ((1 << (high - low + 1)) - 1) << (low + Y_RANGE) if low <= high else 0
+
+    def shift(bits, step):
+        """Positions r whose next position r + step is in bits."""
+        return (bits >> step if step >= 0 else bits << -step) & full
+
+    half_height = BIRD_SIZE[1] // 2
+    lowest = gap // 2 - half_height - SAFETY_MARGIN
+    highest = half_height - gap // 2 + SAFETY_MARGIN
+    in_gap = band(highest, lowest)
+    above_gap_bottom = band(-Y_RANGE, lowest)  # Away from the pipe: just don't sink below the gap
+    last_overlap = -(-(pipe_width + BIRD_SIZE[0] - 1) // speed)
+
+    steps = velocity_pixel_steps()
+    last = VELOCITY_STEPS - 1
+    safe = [full] * VELOCITY_STEPS  # Pipe cleared: everything is safe
+    thresholds = [[Y_RANGE] * DISTANCE_STEPS for _ in range(VELOCITY_STEPS)]
+    for distance in range(1, DISTANCE_STEPS):
+        # The collision check happens after the move, one frame closer
+        allowed = in_gap if 1 <= distance - 1 <= last_overlap else above_gap_bottom
+        good = [bits & allowed for bits in safe]
+        flap = shift(good[1], steps[1])
+        next_safe = []
+        for velocity in range(VELOCITY_STEPS):
+            following = min(velocity + 1, last)
+            glide = shift(good[following], steps[following])
+            next_safe.append(glide | flap)
+            # Flap whenever the bird is lower than the lowest safe glide. If
+            # gliding is never safe, flap wherever flapping is; if nothing is,
+            # head for the middle of the gap.
+            if glide:
+                threshold = glide.bit_length() - 1 - Y_RANGE
+            elif flap:
+                threshold = (flap & -flap).bit_length() - 2 - Y_RANGE
+            else:
+                threshold = 0
+            thresholds[velocity][distance] = threshold
+        safe = next_safe
+    return thresholds
+
+
+def build_table(pipe_width):
+    table = array('h')
+    for speed in SPEEDS:
+        for gap in GAP_BUCKETS:
+            for row in solve_thresholds(speed, gap, pipe_width):
+                table.extend(row)
+    return table
+
+
+def save_tables(tables, path=AUTOPILOT_TABLE):
+    """Save {pipe width: table} as one compressed record per width."""
+    with open(path, 'wb') as f:
+        for pipe_width, table in sorted(tables.items()):
+            data = array('h', table)
+            if sys.byteorder != 'little':
+                data.byteswap()
+            data = zlib.compress(data.tobytes(), 9)
+            f.write(TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, physics_fingerprint(pipe_width),
+                                      pipe_width, len(data)))
+            f.write(data)
+
+
+def load_table(pipe_width, path=AUTOPILOT_TABLE):
+    """Load the threshold table for a pipe width, solving it if the file doesn't have it.
+
+    Solving takes most of a second, so call this off the frame path.
+    """
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                header = f.read(TABLE_HEADER.size)
+                if not header:
+                    break
+                magic, version, fingerprint, width, size = TABLE_HEADER.unpack(header)
+                if (magic, version) != (TABLE_MAGIC, TABLE_VERSION):
+                    print(f"Autopilot table {path} is out of date; rebuilding (run autopilot.py --build)")
+                    return build_table(pipe_width)
+                data = f.read(size)
+                if width != pipe_width:
+                    continue
+                if fingerprint != physics_fingerprint(pipe_width):
+                    print(f"Autopilot table {path} is out of date; rebuilding (run autopilot.py --build)")
+                    return build_table(pipe_width)
+                table = array('h')
+                table.frombytes(zlib.decompress(data))
+                if sys.byteorder != 'little':
+                    table.byteswap()
+                return table
+        print(f"Solving an autopilot table for {pipe_width}px pipes")
+    except (OSError, struct.error, zlib.error) as e:
+        print(f"Autopilot table {path} unavailable ({e}); rebuilding")
+    return build_table(pipe_width)
+
+
+class Autopilot:
+    """Decides whether to flap with one table lookup per frame."""
+
+    def __init__(self):
+        self.tables = {}  # Pipe width -> threshold table, once loaded
+        self.workers = {}  # Pipe width -> thread loading or solving its table
+
+        # Gap bucket for every gap height in pixels
+        self.gap_index = []
+        for gap in range(SCREEN_HEIGHT + 1):
+            index = 0
+            for i, bucket in enumerate(GAP_BUCKETS):
+                if gap >= bucket:
+                    index = i
+            self.gap_index.append(index)
+
+    def load(self, pipe_width):
+        """Load (or solve) the table for a pipe width, blocking until it is ready."""
+        self.tables[pipe_width] = load_table(pipe_width)
+
+    def prepare(self, pipe_width):
+        """Whether the table for a pipe width is ready, loading it on a worker thread if not."""
+        if pipe_width in self.tables:
+            return True
+        if pipe_width not in self.workers:
+            worker = threading.Thread(target=self.load, args=(pipe_width,), daemon=True)
+            self.workers[pipe_width] = worker
+            worker.start()
+        return False
+
+    def next_gap(self, game):
+        """(top, bottom, distance) of the next gap the bird has to clear."""
+        bird = game.bird.rect
+        pipes = game.pipe_list
+        # Pipes come in (bottom, top) pairs, oldest first
+        for i in range(0, len(pipes) - 1, 2):
+            bottom, top = pipes[i].rect, pipes[i + 1].rect
+            if bottom.right > bird.left:
+                # The floor and ceiling close off gaps that run past them
+                return max(top.bottom, 0), min(bottom.top, FLOOR_Y_POS), bottom.right - bird.left
+        # No pipe yet: stay within the range gap centres spawn in (see create_pipe)
+        return 200, SCREEN_HEIGHT - 200, None
+
+    def should_flap(self, game):
+        """Whether to flap this frame. Never flaps without a table ready (see prepare)."""
+        table = self.tables.get(game.pipe_size[0])
+        if table is None:
+            return False
+
+        bird = game.bird
+        top, bottom, distance = self.next_gap(game)
+
+        speed = min(max(int(game.state.current_speed + 0.5), SPEEDS[0]), SPEEDS[-1])
+        gap = self.gap_index[min(max(bottom - top, 0), SCREEN_HEIGHT)]
+        velocity = int((bird.movement - FLAP_STRENGTH) / GRAVITY + 0.5)
+        velocity = min(max(velocity, 0), VELOCITY_STEPS - 1)
+        if distance is None:
+            distance = DISTANCE_STEPS - 1
+        else:
+            distance = min(-(-distance // speed), DISTANCE_STEPS - 1)
+
+        index = (((speed - SPEEDS[0]) * len(GAP_BUCKETS) + gap) * VELOCITY_STEPS + velocity) * DISTANCE_STEPS
+        return bird.rect.centery - (top + bottom) // 2 > table[index + distance]
+
+
+class AttractMode:
+    """Plays demo games with the autopilot while the title screen is idle.
+
+    Any key or click during a demo returns to the title screen. With
+    interruptible=False the demo keeps playing regardless (kiosk demos).
+    A demo only starts once the autopilot has a table for the current pipes.
+    """
+
+    def __init__(self, autopilot=None, idle_time=ATTRACT_IDLE_TIME, interruptible=True):
+        self.autopilot = autopilot or Autopilot()
+        self.idle_frames = idle_time * FPS // 1000
+        self.interruptible = interruptible
+        self.idle = 0
+        self.paused_frames = 0
+        self.running = False
+        self.label = None
+
+    def attach(self, game):
+        self.label = game.message_font.render("DEMO", True, WHITE)
+        self.autopilot.prepare(game.pipe_size[0])  # Load now rather than when the first demo is due
+
+    def on_input(self, game):
+        """Called for each key or click. Returns True if a demo swallowed it."""
+        self.idle = 0
+        if not self.running:
+            return False
+        if self.interruptible:
+            self.running = False
+            game.state.game_active = False
+        return True
+
+    def update(self, game):
+        """Called once per frame before the game updates."""
+        state = game.state
+        if not self.running:
+            if state.game_active or state.show_customization:
+                self.idle = 0
+                return
+            self.idle += 1
+            # Checked every idle frame, so a new pipe skin starts its table loading
+            if self.idle >= self.idle_frames and self.autopilot.prepare(game.pipe_size[0]):
+                self.idle = 0
+                self.running = True
+                game.apply_game_event('flap')  # Starts a new game
+            return
+
+        if not state.game_active:
+            self.running = False  # Game over; back to the title screen
+        elif state.paused:
+            self.paused_frames += 1
+            if self.paused_frames >= RESUME_DELAY:
+                self.paused_frames = 0
+                game.apply_game_event('flap')
+        elif self.autopilot.should_flap(game):
+            game.apply_game_event('flap')
+
+    def draw(self, queue, game):
+        if self.running:
+            queue.submit(self.label, (SCREEN_WIDTH - self.label.get_width() - 20, 20), layer=LAYER_HUD)
+
+
+def benchmark(frames, seed=0):
+    """Run a demo headlessly; return (scores, microseconds per decision)."""
+    from utils import init_headless
+    init_headless()
+    from game import FlappyBird
+    from replay import Course
+
+    game = FlappyBird(course=Course(seed))
+    autopilot = Autopilot()
+    autopilot.load(game.pipe_size[0])
+    scores = []
+    decisions = 0
+    decision_time = 0.0
+    game.apply_game_event('flap')
+    for _ in range(frames):
+        state = game.state
+        if not state.game_active:
+            scores.append(state.score)
+            game.apply_game_event('flap')
+        elif state.paused:
+            game.apply_game_event('flap')
+        else:
+            start = time.perf_counter()
+            flap = autopilot.should_flap(game)
+            decision_time += time.perf_counter() - start
+            decisions += 1
+            if flap:
+                game.apply_game_event('flap')
+        game.update()
+    scores.append(game.state.score)
+    return scores, decision_time / max(decisions, 1) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or check the autopilot table.')
+    parser.add_argument('--build', action='store_true',
+                        help='Solve and save tables for every installed pipe skin width')
+    parser.add_argument('--check', type=int, metavar='FRAMES', help='Play a headless demo for FRAMES frames')
+    parser.add_argument('--output', default=AUTOPILOT_TABLE)
+    args = parser.parse_args()
+
+    if args.build:
+        start = time.perf_counter()
+        widths = installed_pipe_widths()
+        save_tables({width: build_table(width) for width in widths}, args.output)
+        print(f"Saved {args.output} with tables for {', '.join(f'{w}px' for w in widths)} pipes "
+              f"({os.path.getsize(args.output)} bytes) in {time.perf_counter() - start:.1f}s")
+    if args.check:
+        scores, us = benchmark(args.check)
+        print(f"Scores {scores}; {us:.2f}us per decision")
+
+
+if __name__ == '__main__':
+    main()
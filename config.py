@@ -28,17 +28,32 @@ PIPE_GAP_UPDATE_FREQUENCY = 5  # Update gap every X points
 PIPE_SPAWN_TIME = 1500  # Increased for better spacing
 POWER_UP_SPAWN_TIME = 5000
 BIRD_FLAP_TIME = 200
+ATTRACT_IDLE_TIME = 10000  # Idle title screen time before a demo game starts
 
 # Power up settings
 POWER_UP_SPAWN_CHANCE = 0.3  # 30% chance
 PIPES_FOR_FOGGY = 3
 PIPES_FOR_INVINCIBLE = 3
 POWER_UP_SIZE = (30, 30)
+HEART_EFFECT_TICKS = 60  # Frames
+WIDER_GAP_TICKS = 60  # Frames
+INVINCIBLE_MESSAGE_TICKS = 120  # Frames the "INVINCIBLE!" message stays on screen
+EFFECT_WHEEL_SIZE = 256  # Timer wheel buckets for power-up effects
 
 # Game position constants
 BIRD_START_POS = (100, SCREEN_HEIGHT // 2)
 SCORE_Y_POS = 100
 FLOOR_Y_POS = SCREEN_HEIGHT - 100
+BACKGROUND_Y_POS = -150
+
+# Parallax scrolling, as fractions of the pipe speed
+PARALLAX_SPEEDS = {
+    'sky': 0.1,
+    'far': 0.35,
+    'floor': 1.0
+}
+BACKGROUND_SIZE = (576, 1024)  # Background image size after scale2x; skins of other sizes are scaled to it
+PARALLAX_SKY_HEIGHT = 680  # Rows of the (scaled) background image that scroll as sky
 
 # Colors (RGB)
 WHITE = (255, 255, 255)
@@ -52,21 +67,13 @@ YELLOW = (255, 255, 0)
 FONT_SIZE = 24
 TITLE_FONT_SIZE = 32
 FOG_ALPHA = 150  # Transparency for fog effect
+GHOST_ALPHA = 90  # Transparency for ghost race birds
 BUTTON_WIDTH = 120
 BUTTON_HEIGHT = 30
 BUTTON_SPACING = 20
 
-# Button colors
-BUTTON_COLORS = {
-    'yellow_bird': (200, 200, 0),
-    'red_bird': (200, 0, 0),
-    'blue_bird': (0, 0, 200),
-    'day_bg': (100, 150, 200),
-    'night_bg': (50, 50, 100),
-    'green_pipe': (0, 200, 0),
-    'red_pipe': (200, 0, 0),
-    'customize': (100, 100, 200)
-}
+# Button color for skins whose pack doesn't set one
+DEFAULT_BUTTON_COLOR = (100, 100, 100)
 
 # Button positions (adjusted for smaller screen)
 BUTTON_POSITIONS = {
@@ -80,31 +87,6 @@ BUTTON_POSITIONS = {
 
 # Asset paths
 ASSET_PATHS = {
-    'backgrounds': {
-        'day': 'images/background-day.png',
-        'night': 'images/background-night.png'
-    },
-    'birds': {
-        'yellow': {
-            'downflap': 'images/yellowbird-downflap.png',
-            'midflap': 'images/yellowbird-midflap.png',
-            'upflap': 'images/yellowbird-upflap.png'
-        },
-        'red': {
-            'downflap': 'images/redbird-downflap.png',
-            'midflap': 'images/redbird-midflap.png',
-            'upflap': 'images/redbird-upflap.png'
-        },
-        'blue': {
-            'downflap': 'images/bluebird-downflap.png',
-            'midflap': 'images/bluebird-midflap.png',
-            'upflap': 'images/bluebird-upflap.png'
-        }
-    },
-    'pipes': {
-        'green': 'images/pipe-green.png',
-        'red': 'images/pipe-red.png'
-    },
     'base': 'images/base.png',
     'gameover': 'images/gameover.png',
     'message': 'images/message.png',
@@ -118,6 +100,14 @@ ASSET_PATHS = {
     }
 }
 
+# Skin packs (see skins.py); the built-in skins are the pack in images/
+SKIN_DIRECTORIES = ['images', 'skins']
+SKIN_MANIFEST = 'skin.json'
+SKIN_CACHE_BYTES = 16 * 1024 * 1024  # Decoded skin images kept in memory
+
+# Precomputed autopilot decisions (see autopilot.py)
+AUTOPILOT_TABLE = 'autopilot.bin'
+
 # Custom event IDs
 EVENTS = {
     'BIRDFLAP': pygame.USEREVENT + 0,
@@ -0,0 +1,64 @@
+# eventbus.py
+"""Game-rule events and a small synchronous event bus.
+
+The simulation emits each event once, when it happens; subsystems
+(difficulty, effects, audio, HUD, telemetry) subscribe to the events they
+care about instead of re-checking game state every frame.
+"""
+
+
+class PipePassed:
+    def __init__(self, pipe):
+        self.pipe = pipe
+
+
+class Flapped:
+    pass
+
+
+class ScoreChanged:
+    def __init__(self, score):
+        self.score = score
+
+
+class Collision:
+    def __init__(self, hearts):
+        self.hearts = hearts  # Hearts left after the hit
+
+    @property
+    def fatal(self):
+        return self.hearts <= 0
+
+
+class PowerUpCollected:
+    def __init__(self, power_up_type):
+        self.power_up_type = power_up_type
+
+
+class EventBus:
+    def __init__(self):
+        self.subscribers = {}
+
+    def subscribe(self, event_type, handler):
+        """Call handler(event) for every emitted event of event_type, in subscription order."""
+        self.subscribers.setdefault(event_type, []).append(handler)
+
+    def unsubscribe(self, event_type, handler):
+        self.subscribers.get(event_type, []).remove(handler)
+
+    def emit(self, event):
+        for handler in self.subscribers.get(type(event), ()):
+            handler(event)
+
+
+class Telemetry:
+    """Counts emitted events by type."""
+
+    def __init__(self, bus):
+        self.counts = {}
+        for event_type in (PipePassed, ScoreChanged, Collision, PowerUpCollected):
+            bus.subscribe(event_type, self.on_event)
+
+    def on_event(self, event):
+        name = type(event).__name__
+        self.counts[name] = self.counts.get(name, 0) + 1
@@ -0,0 +1,106 @@
+# exporter.py
+"""Render a recorded run to PNG frames or a raw RGB stream, headless and in parallel.
+
+Usage:
+    python exporter.py run.json out_dir --format png --workers 4
+    python exporter.py run.json out.rgb --format rgb
+
+The frame range is split into chunks. Each worker replays the run up to its
+chunk start without drawing, then renders its frames through FlappyBird.draw.
+PNG frames are named by global frame index; RGB chunks are concatenated in
+order into the output file (SCREEN_WIDTH x SCREEN_HEIGHT, 3 bytes per pixel).
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from config import *
+from replay import Recording, ReplayPlayer
+from utils import init_headless
+
+DEFAULT_CHUNK_SIZE = 600
+
+
+def split_frames(length, chunk_size):
+    """Split range(length) into (start, end) chunks."""
+    return [(start, min(start + chunk_size, length)) for start in range(0, length, chunk_size)]
+
+
+def render_chunk(job):
+    """Worker entry point: render frames [start, end) of a recording."""
+    recording_data, start, end, fmt, target = job
+
+    init_headless()
+    import pygame
+    from game import FlappyBird
+
+    game = FlappyBird()
+    player = ReplayPlayer(game, Recording.from_dict(recording_data))
+    player.seek(start)
+
+    if fmt == 'rgb':
+        out = open(target, 'wb')
+    try:
+        while player.frame < end:
+            frame = player.frame
+            player.step()
+            game.draw()
+            if fmt == 'png':
+                pygame.image.save(game.screen, os.path.join(target, 'frame_{:06d}.png'.format(frame)))
+            else:
+                out.write(pygame.image.tostring(game.screen, 'RGB'))
+    finally:
+        if fmt == 'rgb':
+            out.close()
+        pygame.quit()
+
+    return start, end
+
+
+def export(recording, output, fmt='png', workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Render every frame of a recording to output using a process pool."""
+    chunks = split_frames(recording.length, chunk_size)
+    data = recording.to_dict()
+
+    if fmt == 'png':
+        os.makedirs(output, exist_ok=True)
+        jobs = [(data, start, end, fmt, output) for start, end in chunks]
+        with multiprocessing.Pool(workers) as pool:
+            for _ in pool.imap_unordered(render_chunk, jobs):
+                pass
+        return
+
+    # RGB: each worker writes its own chunk file, stitched here in order
+    tmp_dir = tempfile.mkdtemp(prefix='flappy-export-')
+    try:
+        jobs = [(data, start, end, fmt, os.path.join(tmp_dir, '{:08d}.rgb'.format(start)))
+                for start, end in chunks]
+        with multiprocessing.Pool(workers) as pool, open(output, 'wb') as out:
+            # imap yields in submission order, so chunks are appended as soon
+            # as every earlier chunk is done
+            for job, _ in zip(jobs, pool.imap(render_chunk, jobs)):
+                with open(job[4], 'rb') as chunk:
+                    shutil.copyfileobj(chunk, out)
+                os.remove(job[4])
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a recorded run as frames.')
+    parser.add_argument('recording', help='Recording JSON file')
+    parser.add_argument('output', help='Output directory (png) or file (rgb)')
+    parser.add_argument('--format', choices=['png', 'rgb'], default='png')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    recording = Recording.load(args.recording)
+    export(recording, args.output, args.format, args.workers, args.chunk_size)
+    print(f"Exported {recording.length} frames ({SCREEN_WIDTH}x{SCREEN_HEIGHT}) to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
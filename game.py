@@ -1,16 +1,21 @@
 # game.py
 import pygame
 import sys
-import random
 from config import *
 from models import *
 from ui import *
 from sprites import *
 from utils import *
+from render import *
+from eventbus import *
+from skins import SkinRegistry
 
 
-class FlappyBird:
-    def __init__(self):
+class FlappyBird(GameCore):
+    """The playable game: GameCore's rules plus the window, input, drawing and sound."""
+
+    def __init__(self, recorder=None, ghost_race=None, hitch_detector=None, course=None,
+                 attract_mode=None, rivals=None):
         pygame.init()
         pygame.mixer.init()
         pygame.display.set_caption('Flappy Bird')
@@ -19,9 +24,17 @@ class FlappyBird:
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         self.clock = pygame.time.Clock()
 
-        # Initialize game state and UI
-        self.state = GameState()
-        self.ui = CustomizationMenu()
+        # Game state, pipes, power-ups and rules, on the fixed pipe course
+        # (see replay.py) if given; ghost races bring their own course
+        if course is None and ghost_race is not None:
+            course = ghost_race.course
+        super().__init__(course=course)
+
+        # Skin packs (see skins.py); images are decoded when a skin is first used
+        self.skins = SkinRegistry()
+
+        # Initialize UI
+        self.ui = CustomizationMenu(self.skins)
 
         # Load assets
         self.load_assets()
@@ -29,28 +42,66 @@ class FlappyBird:
         # Initialize sprites
         self.setup_sprites()
 
-        # Initialize game objects
-        self.pipe_list = []
-        self.power_ups = []
+        # HUD, audio and telemetry react to simulation events
+        self.setup_rules()
+
+        # Batches all drawing for a frame (see render.py)
+        self.render_queue = RenderQueue()
+
+        # Optional run recorder (see replay.py)
+        self.recorder = recorder
 
         # Setup game events
         self.setup_events()
 
+        # Optional fixed pipe course and ghost race mode (see ghosts.py)
+        if self.course is not None:
+            self.course.attach(self)
+        self.ghost_race = ghost_race
+        if self.ghost_race is not None:
+            self.ghost_race.attach(self)
+
+        # Optional live rival birds, drawn like ghosts (see multiplayer.py)
+        self.rivals = rivals
+        if self.rivals is not None:
+            self.rivals.attach(self)
+
+        # Optional autopilot demos on the idle title screen (see autopilot.py)
+        self.attract_mode = attract_mode
+        if self.attract_mode is not None:
+            self.attract_mode.attach(self)
+
+        # Optional GC control and hitch logging (see hitch.py); attached last
+        # so everything loaded above is frozen
+        self.hitch_detector = hitch_detector
+        if self.hitch_detector is not None:
+            self.hitch_detector.attach(self)
+
     def load_assets(self):
         """Load all game assets."""
-        # Load backgrounds
-        self.bg_surfaces = {
-            'day': load_scaled_image(ASSET_PATHS['backgrounds']['day']),
-            'night': load_scaled_image(ASSET_PATHS['backgrounds']['night'])
-        }
+        # Pre-made effect surfaces
+        self.power_up_surface = pygame.Surface(POWER_UP_SIZE)
+        self.power_up_surface.fill(YELLOW)
+        text = pygame.font.Font(None, 36).render("!", True, BLACK)
+        self.power_up_surface.blit(text, text.get_rect(center=self.power_up_surface.get_rect().center))
 
-        # Load pipes
-        self.pipe_surfaces = {
-            'green': load_scaled_image(ASSET_PATHS['pipes']['green']),
-            'red': load_scaled_image(ASSET_PATHS['pipes']['red'])
-        }
+        self.fog_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.fog_surface.fill(WHITE)
+        self.fog_surface.set_alpha(FOG_ALPHA)
+
+        self.wider_gap_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        pygame.draw.rect(self.wider_gap_surface, (0, 191, 255),
+                         pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT), 3)
+
+        # Scrolling sky, far background and floor; the background comes from the chosen skin
+        self.parallax = Parallax(pygame.transform.scale2x(
+            pygame.image.load(ASSET_PATHS['base']).convert()))
 
         # Load UI elements
+        self.message_font = pygame.font.Font(None, 48)
+        self.invincible_message = self.message_font.render("INVINCIBLE!", True, (255, 215, 0))
+        self.invincible_message_pos = self.invincible_message.get_rect(center=(SCREEN_WIDTH // 2, 150))
+        self.invincible_message_frames = 0  # Frames left to show it
         self.game_over_surface = load_scaled_image(ASSET_PATHS['gameover'])
         self.message_surface = load_scaled_image(ASSET_PATHS['message'])
 
@@ -64,51 +115,88 @@ class FlappyBird:
 
     def setup_sprites(self):
         """Initialize game sprites."""
-        self.bird = Bird(self.state.current_bird)
-        self.floor = Floor()
+        self.bird = Bird(self.skins.load('bird', self.state.current_bird))
 
         # Create sprite groups
         self.all_sprites = pygame.sprite.Group()
         self.all_sprites.add(self.bird)
-        self.all_sprites.add(self.floor)
 
-    def setup_events(self):
-        """Setup pygame custom events."""
-        pygame.time.set_timer(EVENTS['BIRDFLAP'], BIRD_FLAP_TIME)
-        pygame.time.set_timer(EVENTS['SPAWNPIPE'], PIPE_SPAWN_TIME)
-        pygame.time.set_timer(EVENTS['SPAWNPOWERUP'], POWER_UP_SPAWN_TIME)
+        # Skin ids currently applied, by customization category
+        self.skin_ids = {}
+        self.update_skins()
+
+    def update_skins(self):
+        """Apply the skins chosen in the game state, if they have changed.
+
+        Choices change from the customization menu or from a replay's settings.
+        """
+        chosen = {
+            'bird': self.state.current_bird,
+            'background': self.state.current_bg,
+            'pipe': self.state.current_pipe
+        }
+        for category, skin_id in chosen.items():
+            if self.skin_ids.get(category) == skin_id:
+                continue
+            self.skin_ids[category] = skin_id
+            skin = self.skins.load(category, skin_id)
+            if category == 'bird':
+                self.bird.set_frames(skin)
+            elif category == 'background':
+                self.parallax.set_background(skin)
+            else:
+                self.pipe_skin = skin
+                self.pipe_size = skin.size
 
-    def create_pipe(self):
-        """Create new pipe obstacles."""
-        pipe_surface = self.pipe_surfaces[self.state.current_pipe]
-        pipe_height = pipe_surface.get_height()
+    def setup_rules(self):
+        """Subscribe the game's subsystems to simulation events.
 
-        # Calculate gap position (leaving space at top and bottom)
-        min_y = 200
-        max_y = SCREEN_HEIGHT - 200
-        gap_y = random.randint(min_y, max_y)
+        The rules themselves (difficulty, effects, collisions) are subscribed
+        by GameCore.
+        """
+        bus = self.bus
 
-        # Create pipes
-        bottom_pipe = Pipe(SCREEN_WIDTH, gap_y + self.state.current_pipe_gap // 2, True)
-        top_pipe = Pipe(SCREEN_WIDTH, gap_y - self.state.current_pipe_gap // 2 - pipe_height, False)
+        # HUD only changes with the score
+        bus.subscribe(ScoreChanged, self.update_score_display)
 
-        bottom_pipe.rect.size = pipe_surface.get_size()
-        top_pipe.rect.size = pipe_surface.get_size()
+        # Audio
+        bus.subscribe(Flapped, lambda event: self.sounds['wing'].play())
+        bus.subscribe(PipePassed, lambda event: self.sounds['point'].play())
+        bus.subscribe(PowerUpCollected, lambda event: self.sounds['point'].play())
+        bus.subscribe(Collision, self.play_collision_sounds)
 
-        return bottom_pipe, top_pipe
+        self.telemetry = Telemetry(bus)
+        self.update_score_display(ScoreChanged(self.state.score))
 
-    def create_power_up(self):
-        """Create a new power-up."""
-        random_y = random.randint(200, SCREEN_HEIGHT - 200)
-        return PowerUp(SCREEN_WIDTH, random_y)
+    def update_score_display(self, event):
+        """Cache the score digits' layout; redone only when the score changes."""
+        self.score_layout = layout_score(event.score, self.number_surfaces)
+
+    def play_collision_sounds(self, event):
+        self.sounds['hit'].play()
+        if event.fatal:
+            self.sounds['die'].play()
+
+    def setup_events(self):
+        """Setup pygame custom events."""
+        pygame.time.set_timer(EVENTS['BIRDFLAP'], BIRD_FLAP_TIME)
+        pygame.time.set_timer(EVENTS['SPAWNPIPE'], PIPE_SPAWN_TIME)
+        pygame.time.set_timer(EVENTS['SPAWNPOWERUP'], POWER_UP_SPAWN_TIME)
 
     def handle_input(self):
         """Handle user input events."""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if self.hitch_detector is not None:
+                    print(f"Frame times: {self.hitch_detector.summary()}")
                 pygame.quit()
                 sys.exit()
 
+            # Any key or click ends a demo game and is not passed on
+            if self.attract_mode is not None and event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                if self.attract_mode.on_input(self):
+                    continue
+
             # First, handle customization menu if it's open
             if self.state.show_customization:
                 if event.type == pygame.MOUSEBUTTONDOWN:
@@ -135,35 +223,23 @@ class FlappyBird:
             # Handle game input only if not in customization
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
-                    self.handle_jump_input()
+                    self.apply_game_event('flap')
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1 and not self.ui.customize_button.rect.collidepoint(event.pos):
-                    self.handle_jump_input()
+                    self.apply_game_event('flap')
 
             # Handle game events
             if event.type == EVENTS['SPAWNPIPE'] and self.state.game_active and not self.state.paused:
-                self.pipe_list.extend(self.create_pipe())
+                self.apply_game_event('pipe')
 
             if event.type == EVENTS['SPAWNPOWERUP'] and self.state.game_active and not self.state.paused:
-                if random.random() < POWER_UP_SPAWN_CHANCE:
-                    self.power_ups.append(self.create_power_up())
+                self.apply_game_event('powerup')
 
-    def handle_jump_input(self):
-        """Handle jump input from either keyboard or mouse."""
-        if self.state.game_active:
-            if self.state.paused:
-                # When game is paused after collision, reset bird position and unpause
-                self.bird.reset_position()
-                self.state.paused = False
-                # Ensure foggy mode is active
-                self.state.foggy_mode = True
-                self.state.foggy_pipes_remaining = PIPES_FOR_FOGGY
-                self.state.pipes_passed = 0
-            else:
-                self.bird.flap()
-                self.sounds['wing'].play()
-        else:
-            self.reset_game()
+    def apply_game_event(self, kind):
+        """Record a simulation event, then apply it (see GameCore.apply_game_event)."""
+        if self.recorder is not None:
+            self.recorder.record(self.frame_count, kind)
+        super().apply_game_event(kind)
 
     def apply_customization(self, category, option):
         """Apply customization options."""
@@ -173,21 +249,12 @@ class FlappyBird:
         print(f"Applying {category} customization: {option}")  # Debug print
 
         if category == 'bird':
-            color = option.lower()
-            self.state.current_bird = color
-            # Create new bird with selected color
-            new_bird = Bird(color)
-            new_bird.rect.center = self.bird.rect.center
-            new_bird.movement = self.bird.movement
-            self.bird = new_bird
-            # Recreate sprite group with new bird
-            self.all_sprites = pygame.sprite.Group()
-            self.all_sprites.add(self.bird)
-            self.all_sprites.add(self.floor)
+            self.state.current_bird = option
         elif category == 'background':
-            self.state.current_bg = option.lower()
+            self.state.current_bg = option
         elif category == 'pipe':
-            self.state.current_pipe = option.lower()
+            self.state.current_pipe = option
+        self.update_skins()
 
         # Force update active buttons
         self.ui.update_active_buttons(self.state)
@@ -196,208 +263,122 @@ class FlappyBird:
         print(
             f"Current state - Bird: {self.state.current_bird}, BG: {self.state.current_bg}, Pipe: {self.state.current_pipe}")
 
-    def check_collisions(self):
-        """Check for collisions between bird and obstacles."""
-        if self.state.invincible:
-            return True
-
-        collision_occurred = False
-
-        # Check pipe collisions
-        if check_collision(self.bird.rect, self.pipe_list):
-            collision_occurred = True
-
-        # Check boundary collisions (including ground)
-        if self.bird.rect.top <= 0 or self.bird.rect.bottom >= FLOOR_Y_POS:
-            collision_occurred = True
-            # Ensure bird doesn't go below the floor
-            if self.bird.rect.bottom > FLOOR_Y_POS:
-                self.bird.rect.bottom = FLOOR_Y_POS
-                self.bird.movement = 0
-
-        if collision_occurred:
-            self.sounds['hit'].play()
-            self.state.hearts -= 1
-            self.state.paused = True  # Pause the game on collision
-
-            if self.state.hearts <= 0:
-                self.sounds['die'].play()
-                return False
-            else:
-                # Don't reset position immediately - wait for player input
-                # Clear pipes and setup foggy mode
-                self.pipe_list.clear()
-                self.state.foggy_mode = True
-                self.state.foggy_pipes_remaining = PIPES_FOR_FOGGY
-                self.state.pipes_passed = 0
-                return True
-
-        return True
-
-    def check_power_up_collisions(self):
-        """Check for collisions with power-ups."""
-        for power_up in self.power_ups:
-            if not power_up.collected and self.bird.rect.colliderect(power_up.rect):
-                power_up.collected = True
-                self.apply_power_up(power_up.type)
-
-    def apply_power_up(self, power_up_type):
+    def apply_power_up(self, event):
         """Apply power-up effects."""
-        # Play power-up sound
-        self.sounds['point'].play()
-
-        if power_up_type == PowerUpType.HEART:
-            self.state.hearts = min(self.state.hearts + 1, INITIAL_HEARTS)
-            self.state.heart_effect_timer = 60  # Effect lasts for 60 frames
-
-        elif power_up_type == PowerUpType.INVINCIBLE:
-            self.state.invincible = True
-            self.state.invincible_pipes = PIPES_FOR_INVINCIBLE
-            # Display invincibility message
-            font = pygame.font.Font(None, 48)
-            text = font.render("INVINCIBLE!", True, (255, 215, 0))
-            text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, 150))
-            self.screen.blit(text, text_rect)
-
-        elif power_up_type == PowerUpType.WIDER_GAP:
-            self.state.current_pipe_gap = INITIAL_PIPE_GAP
-            self.state.wider_gap_effect = True
-            self.state.wider_gap_timer = 60
+        super().apply_power_up(event)
+
+        if event.power_up_type == PowerUpType.INVINCIBLE:
+            # Display invincibility message for a while (see draw)
+            self.invincible_message_frames = INVINCIBLE_MESSAGE_TICKS
 
     def update(self):
         """Update game state and sprites."""
-        if self.state.game_active and not self.state.paused:
-            # Update sprites
-            self.all_sprites.update()
+        self.update_skins()
+        if self.attract_mode is not None:
+            self.attract_mode.update(self)
 
-            # Move pipes and check for score
-            for pipe in self.pipe_list:
-                pipe.move(self.state.current_speed)
-                # Check for score
-                if pipe.rect.centerx < self.bird.rect.centerx and not pipe.passed and pipe.is_bottom:
-                    self.state.score += 1
-                    pipe.passed = True
-                    self.sounds['point'].play()
-
-            # Clean up off-screen pipes
-            self.pipe_list = [pipe for pipe in self.pipe_list if not pipe.off_screen]
-
-            # Update power-ups
-            for power_up in self.power_ups:
-                if not power_up.collected:
-                    power_up.move(self.state.current_speed)
-            self.power_ups = [p for p in self.power_ups if p.rect.right > -50 and not p.collected]
+        running = self.state.game_active and not self.state.paused
+        if running:
+            # Scrolling layers
+            self.parallax.update(self.state.current_speed)
+            if self.invincible_message_frames:
+                self.invincible_message_frames -= 1
 
-            # Check collisions
-            self.state.game_active = self.check_collisions()
-            self.check_power_up_collisions()
+        self.step()
 
-            # Update difficulty
-            self.state.update_difficulty()
-
-            # Update fog mode
-            if self.state.foggy_mode:
-                if any(pipe.passed for pipe in self.pipe_list if pipe.is_bottom):
-                    self.state.pipes_passed += 1
-                    if self.state.pipes_passed >= PIPES_FOR_FOGGY:
-                        self.state.foggy_mode = False
-                        self.state.foggy_pipes_remaining = 0
-                        self.state.pipes_passed = 0
-
-            # Update power-up effects
-            if self.state.invincible:
-                self.state.invincible_pipes -= 1
-                if self.state.invincible_pipes <= 0:
-                    self.state.invincible = False
-
-            if self.state.heart_effect_timer > 0:
-                self.state.heart_effect_timer -= 1
-
-            if self.state.wider_gap_effect:
-                self.state.wider_gap_timer -= 1
-                if self.state.wider_gap_timer <= 0:
-                    self.state.wider_gap_effect = False
+        if running and not self.state.game_active and self.recorder is not None:
+            self.recorder.finish(self)
 
     def draw(self):
         """Draw all game elements."""
+        queue = self.render_queue
+
         # Draw background
-        bg_surface = self.bg_surfaces['night' if self.state.current_bg == 'night' else 'day']
-        self.screen.blit(bg_surface, (0, -150))
+        self.parallax.draw_background(queue, LAYER_BACKGROUND)
 
         if self.state.game_active:
-            # Draw pipes
-            pipe_surface = self.pipe_surfaces[self.state.current_pipe]
+            # Draw pipes, translucent while invincible
+            if self.state.invincible:
+                pipe_surface = self.pipe_skin.invincible
+                flip_pipe = self.pipe_skin.invincible_flipped
+            else:
+                pipe_surface = self.pipe_skin.surface
+                flip_pipe = self.pipe_skin.flipped
             for pipe in self.pipe_list:
-                if pipe.is_bottom:
-                    self.screen.blit(pipe_surface, pipe.rect)
-                else:
-                    flip_pipe = pygame.transform.flip(pipe_surface, False, True)
-                    self.screen.blit(flip_pipe, pipe.rect)
+                queue.submit(pipe_surface if pipe.is_bottom else flip_pipe, pipe.rect, layer=LAYER_PIPES)
 
             # Draw power-ups
             for power_up in self.power_ups:
                 if not power_up.collected:
-                    pygame.draw.rect(self.screen, YELLOW, power_up.rect)
-                    font = pygame.font.Font(None, 36)
-                    text = font.render("!", True, BLACK)
-                    text_rect = text.get_rect(center=power_up.rect.center)
-                    self.screen.blit(text, text_rect)
-                    
-
-            # Draw power-up effects
-            if self.state.invincible:
-                # Draw invincibility effect on pipes
-                for pipe in self.pipe_list:
-                    pipe_surface = self.pipe_surfaces[self.state.current_pipe].copy()
-                    pipe_surface.set_alpha(128)  # Make pipes semi-transparent
-                    if pipe.is_bottom:
-                        self.screen.blit(pipe_surface, pipe.rect)
-                    else:
-                        flip_pipe = pygame.transform.flip(pipe_surface, False, True)
-                        self.screen.blit(flip_pipe, pipe.rect)
-
-                    if self.state.wider_gap_effect:
-                        # Draw wider gap effect
-                        if len(self.pipe_list) > 0:
-                            pygame.draw.rect(self.screen, (0, 191, 255, 50),
-                                             pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT), 3)
+                    queue.submit(self.power_up_surface, power_up.rect, layer=LAYER_POWER_UPS)
+
+            # Draw wider gap effect
+            if self.state.invincible and self.state.wider_gap_effect and self.pipe_list:
+                queue.submit(self.wider_gap_surface, (0, 0), layer=LAYER_EFFECTS)
 
+            # Draw ghosts and rivals behind the live bird
+            if self.ghost_race is not None:
+                self.ghost_race.draw(queue, self)
+            if self.rivals is not None:
+                self.rivals.draw(queue, self)
 
             # Draw sprites
-            self.all_sprites.draw(self.screen)
+            queue.submit_sprites(self.all_sprites)
+            self.parallax.draw_floor(queue, LAYER_FLOOR)
 
             # Draw UI elements
             for i in range(self.state.hearts):
-                draw_heart(self.screen, 40 + i * 40, 50)
+                draw_heart(queue, 40 + i * 40, 50)
 
-            draw_score(self.screen, self.state.score, self.number_surfaces)
+            for image, position in self.score_layout:
+                queue.submit(image, position, layer=LAYER_HUD)
+            if self.invincible_message_frames:
+                queue.submit(self.invincible_message, self.invincible_message_pos, layer=LAYER_HUD)
+            if self.attract_mode is not None:
+                self.attract_mode.draw(queue, self)
 
             if self.state.foggy_mode:
-                fog_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-                fog_surface.fill(WHITE)
-                fog_surface.set_alpha(FOG_ALPHA)
-                self.screen.blit(fog_surface, (0, 0))
+                queue.submit(self.fog_surface, (0, 0), layer=LAYER_FOG)
 
         else:
             # Draw start/game over screen
-            self.screen.blit(self.message_surface, (SCREEN_WIDTH // 2 - self.message_surface.get_width() // 2, 100))
+            queue.submit(self.message_surface,
+                         (SCREEN_WIDTH // 2 - self.message_surface.get_width() // 2, 100),
+                         layer=LAYER_HUD)
             if self.state.show_customization:
-                self.ui.draw(self.screen, self.state)
+                self.ui.draw(queue, self.state)
             else:
-                self.ui.customize_button.draw(self.screen)
+                self.ui.customize_button.draw(queue)
+
+        queue.flush(self.screen)
 
     def reset_game(self):
         """Reset the game state."""
-        self.state.reset()
-        self.pipe_list.clear()
-        self.power_ups.clear()
-        self.bird.reset_position()
+        super().reset_game()
+        self.parallax.reset()
+        self.invincible_message_frames = 0
+
+        if self.recorder is not None:
+            self.recorder.start(self)
 
     def run(self):
         """Main game loop."""
+        hitches = self.hitch_detector
         while True:
-            self.handle_input()
-            self.update()
-            self.draw()
-            pygame.display.update()
+            if hitches is None:
+                self.handle_input()
+                self.update()
+                self.draw()
+                pygame.display.update()
+            else:
+                hitches.begin_frame(self)
+                self.handle_input()
+                hitches.mark('input')
+                self.update()
+                hitches.mark('update')
+                self.draw()
+                hitches.mark('draw')
+                pygame.display.update()
+                hitches.mark('display')
+                hitches.end_frame()
             self.clock.tick(FPS)
\ No newline at end of file
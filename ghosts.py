@@ -0,0 +1,118 @@
+# ghosts.py
+"""Ghost race: replay many recorded runs as translucent birds beside the player.
+
+All ghosts must have been recorded on the same course (same seed, pipes
+spawned on a fixed frame schedule), which GhostRace enforces for the live
+run too, so any run recorded in ghost mode can be raced against later.
+
+Ghost positions are precomputed once into a single frame-major array of
+bird y coordinates; each frame the visible ghosts are queued on their own
+render layer, which is flushed with one Surface.blits call, from pre-made
+translucent copies of the bird frames.
+"""
+import glob
+import multiprocessing
+import os
+from array import array
+
+import pygame
+from config import *
+from render import LAYER_GHOSTS
+from replay import Course, Recording, ReplayPlayer
+from utils import init_headless
+
+GHOST_HIDDEN = -32768  # y value for ghosts whose run has ended
+
+_trace_game = None  # Headless game reused by each trace worker process
+
+
+def trace_recording(recording_data):
+    """Replay a recording headlessly and return the bird's y for every frame."""
+    global _trace_game
+    if _trace_game is None:
+        init_headless()
+        from game import FlappyBird
+        _trace_game = FlappyBird()
+
+    player = ReplayPlayer(_trace_game, Recording.from_dict(recording_data))
+    trace = array('h')
+    while not player.finished:
+        player.step()
+        trace.append(_trace_game.bird.rect.centery)
+    return trace.tobytes()
+
+
+def load_recordings(paths):
+    """Load recordings from files or directories of *.json files."""
+    recordings = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, '*.json'))) if os.path.isdir(path) else [path]
+        recordings.extend(Recording.load(f) for f in files)
+    return recordings
+
+
+def make_ghost_frames(frames, alpha=GHOST_ALPHA):
+    """Return translucent copies of the bird animation frames."""
+    ghost_frames = []
+    for frame in frames:
+        ghost = frame.copy()
+        ghost.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+        ghost_frames.append(ghost)
+    return ghost_frames
+
+
+class GhostRace:
+    """Races the live bird against a field of recorded runs on one course."""
+
+    def __init__(self, recordings, seed=None, workers=None):
+        if recordings:
+            seed = recordings[0].seed
+            skipped = [r for r in recordings if r.seed != seed]
+            if skipped:
+                print(f"Skipping {len(skipped)} ghost(s) recorded on a different course")
+            recordings = [r for r in recordings if r.seed == seed]
+        self.course = Course(seed)
+        self.count = len(recordings)
+        self.length = max((r.length for r in recordings), default=0)
+        self.positions = self.build_positions(recordings, workers)
+        self.frames = []
+        self.offset = (0, 0)
+
+    def build_positions(self, recordings, workers):
+        """Trace every recording and pack the results frame-major."""
+        positions = array('h', [GHOST_HIDDEN]) * (self.count * self.length)
+        if not recordings:
+            return positions
+
+        # Workers initialise SDL, which catches SIGTERM, so let them exit on
+        # their own instead of using the pool's terminating context manager
+        pool = multiprocessing.Pool(workers)
+        try:
+            traces = pool.map(trace_recording, [r.to_dict() for r in recordings])
+        finally:
+            pool.close()
+            pool.join()
+
+        for ghost, data in enumerate(traces):
+            trace = array('h')
+            trace.frombytes(data)
+            positions[ghost:len(trace) * self.count:self.count] = trace
+        return positions
+
+    def attach(self, game):
+        """Make the ghost frames from the live bird's."""
+        self.frames = make_ghost_frames(game.bird.frames)
+        width, height = self.frames[0].get_size()
+        self.offset = (BIRD_START_POS[0] - width // 2, height // 2)
+
+    def draw(self, queue, game):
+        """Draw every ghost still racing at the current frame."""
+        # Traces hold the bird position after each update() call
+        frame = self.course.frame(game) - 1
+        if not self.count or not 0 <= frame < self.length:
+            return
+
+        image = self.frames[(frame // 10) % len(self.frames)]
+        x, half_height = self.offset
+        row = self.positions[frame * self.count:(frame + 1) * self.count]
+        queue.submit_many(image, [(x, y - half_height) for y in row if y != GHOST_HIDDEN], LAYER_GHOSTS)
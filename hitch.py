@@ -0,0 +1,136 @@
+# hitch.py
+"""Frame hitch detection and GC control.
+
+Automatic generational GC can pause any frame. With HitchDetector attached,
+the objects created while loading are frozen out of the collector, automatic
+collection is disabled, and full collections only run at safe points (game
+over, pause, customization menu) where a pause is not visible.
+
+Every frame is timed per phase (input, update, draw, display). Frames whose
+work time exceeds the budget are logged with their phase times and, when
+allocation tracing is on, the biggest allocation changes within that frame
+(a diff against a tracemalloc snapshot taken as the frame began; taking one
+every frame is slow, so tracing is for diagnosis only).
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from array import array
+
+from config import *
+
+FRAME_BUDGET_MS = 1000 / FPS
+HITCH_TOP_ALLOCATIONS = 5  # Allocation sites logged per hitch
+
+
+class HitchDetector:
+    def __init__(self, budget_ms=FRAME_BUDGET_MS, trace_allocations=False,
+                 log=None, history=FPS * 60 * 10):
+        self.budget_ms = budget_ms
+        self.trace_allocations = trace_allocations
+        self.log = log or sys.stderr
+
+        # Ring buffer of recent frame work times in milliseconds
+        self.frame_times = array('d', bytes(8 * history))
+        self.frame_count = 0
+        self.hitch_count = 0
+        self.collections = 0
+
+        self.phases = []
+        self.frame_start = 0
+        self.phase_start = 0
+        self.at_safe_point = False
+        self.skip_frame = False
+        self.snapshot = None
+
+    def attach(self, game):
+        """Freeze everything loaded so far and take over garbage collection."""
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+
+    def detach(self):
+        gc.unfreeze()
+        gc.enable()
+        if self.trace_allocations:
+            tracemalloc.stop()
+
+    def take_snapshot(self):
+        if self.trace_allocations:
+            # Leave out the detector's own bookkeeping
+            self.snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__)
+            ])
+
+    def is_safe_point(self, game):
+        state = game.state
+        return not state.game_active or state.paused or state.show_customization
+
+    def collect(self):
+        """Run a full collection and re-freeze the survivors."""
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        self.collections += 1
+
+    def begin_frame(self, game):
+        # Collect once on entering a safe point; that frame is not judged
+        safe = self.is_safe_point(game)
+        self.skip_frame = safe and not self.at_safe_point
+        if self.skip_frame:
+            self.collect()
+        self.at_safe_point = safe
+
+        # Baseline for this frame's allocation diff, taken before the frame is timed
+        self.take_snapshot()
+
+        self.phases = []
+        self.frame_start = self.phase_start = time.perf_counter()
+
+    def mark(self, phase):
+        """End the named phase of the current frame."""
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.phase_start) * 1000))
+        self.phase_start = now
+
+    def end_frame(self):
+        frame_ms = (time.perf_counter() - self.frame_start) * 1000
+        self.frame_times[self.frame_count % len(self.frame_times)] = frame_ms
+        self.frame_count += 1
+
+        if frame_ms > self.budget_ms and not self.skip_frame:
+            self.report_hitch(frame_ms)
+
+    def report_hitch(self, frame_ms):
+        self.hitch_count += 1
+        phases = ', '.join(f"{name} {ms:.2f}ms" for name, ms in self.phases)
+        print(f"Hitch at frame {self.frame_count}: {frame_ms:.2f}ms "
+              f"(budget {self.budget_ms:.2f}ms) - {phases}", file=self.log)
+
+        if self.trace_allocations:
+            baseline = self.snapshot
+            self.take_snapshot()
+            for stat in self.snapshot.compare_to(baseline, 'lineno')[:HITCH_TOP_ALLOCATIONS]:
+                print(f"    {stat}", file=self.log)
+
+    def percentile(self, fraction):
+        """Frame work time (ms) at the given fraction, e.g. 0.999 for p99.9."""
+        count = min(self.frame_count, len(self.frame_times))
+        if not count:
+            return 0.0
+        times = sorted(self.frame_times[:count])
+        return times[min(int(fraction * count), count - 1)]
+
+    def summary(self):
+        return {
+            'frames': self.frame_count,
+            'hitches': self.hitch_count,
+            'collections': self.collections,
+            'p50_ms': self.percentile(0.5),
+            'p99_ms': self.percentile(0.99),
+            'p99.9_ms': self.percentile(0.999)
+        }
@@ -1,6 +1,45 @@
 # main.py
+import argparse
 from game import FlappyBird
+from replay import Recorder
 
 if __name__ == "__main__":
-    game = FlappyBird()
-    game.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Flappy Bird')
+    parser.add_argument('--record', metavar='DIR', help='Save each run to DIR for replay/export')
+    parser.add_argument('--ghosts', metavar='PATH', nargs='+',
+                        help='Race against recorded runs (files or directories)')
+    parser.add_argument('--gc-control', action='store_true',
+                        help='Freeze loaded objects, collect only at safe points and log hitches')
+    parser.add_argument('--trace-allocations', action='store_true',
+                        help='With --gc-control, log the allocations made in each hitch frame (slow; for diagnosis)')
+    parser.add_argument('--attract', action='store_true',
+                        help='Play autopilot demo games while the title screen is idle')
+    parser.add_argument('--demo', action='store_true',
+                        help='Play autopilot demo games continuously, ignoring input')
+    args = parser.parse_args()
+
+    ghost_race = None
+    if args.ghosts:
+        from ghosts import GhostRace, load_recordings
+        ghost_race = GhostRace(load_recordings(args.ghosts))
+
+    hitch_detector = None
+    if args.gc_control:
+        from hitch import HitchDetector
+        hitch_detector = HitchDetector(trace_allocations=args.trace_allocations)
+
+    attract_mode = None
+    if args.attract or args.demo:
+        from autopilot import AttractMode
+        if args.demo:
+            attract_mode = AttractMode(idle_time=1000, interruptible=False)
+        else:
+            attract_mode = AttractMode()
+
+    game = FlappyBird(
+        recorder=Recorder(args.record) if args.record else None,
+        ghost_race=ghost_race,
+        hitch_detector=hitch_detector,
+        attract_mode=attract_mode
+    )
+    game.run()
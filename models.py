@@ -1,8 +1,12 @@
 # models.py
+from collections import deque
 from enum import Enum
 import pygame
 import random
 from config import *
+from eventbus import *
+from sprites import BirdBody
+from utils import check_collision
 
 
 class GameState:
@@ -22,17 +26,14 @@ class GameState:
         self.hearts = INITIAL_HEARTS
         self.score = 0
 
-        # Power-up states
+        # Power-up states, set and cleared by their effects
         self.invincible = False
-        self.invincible_pipes = 0
-        self.pipes_passed = 0
         self.foggy_mode = False
-        self.foggy_pipes_remaining = 0
-
-        # Power-up effect states
-        self.heart_effect_timer = 0
+        self.heart_effect = False
         self.wider_gap_effect = False
-        self.wider_gap_timer = 0
+
+        # Timed effects (power-ups, fog)
+        self.effects = EffectEngine(self)
 
         # Customization settings
         self.current_bird = DEFAULT_SETTINGS['bird_color']
@@ -71,6 +72,186 @@ class GameState:
         self.game_active = True
 
 
+class TimerWheel:
+    """Hashed timer wheel: schedules items to fire at an integer time.
+
+    Items are bucketed by deadline modulo the wheel size, so advancing the
+    clock only looks at one bucket instead of every scheduled item.
+    """
+
+    def __init__(self, size=EFFECT_WHEEL_SIZE):
+        self.slots = [[] for _ in range(size)]
+        self.now = 0
+
+    def schedule(self, item, deadline):
+        deadline = max(deadline, self.now + 1)
+        self.slots[deadline % len(self.slots)].append((deadline, item))
+        return deadline
+
+    def advance(self):
+        """Move the clock forward by one and return the items now due."""
+        self.now += 1
+        slot = self.slots[self.now % len(self.slots)]
+        if not slot:
+            return []
+        due = [item for deadline, item in slot if deadline == self.now]
+        if due:
+            slot[:] = [entry for entry in slot if entry[0] != self.now]
+        return due
+
+
+class Effect:
+    """Base class for timed effects.
+
+    Subclasses set name, clock ('ticks' or 'pipes') and duration, and
+    override the start/tick/expire hooks. tick is called once per frame
+    while the effect is active.
+    """
+    name = None
+    clock = 'ticks'
+    duration = 0
+
+    def __init__(self):
+        self.deadline = None
+
+    def start(self, state):
+        pass
+
+    def tick(self, state):
+        pass
+
+    def expire(self, state):
+        pass
+
+
+EFFECT_TYPES = {}
+
+
+def register_effect(effect_class):
+    """Class decorator making an effect available to EffectEngine.apply."""
+    EFFECT_TYPES[effect_class.name] = effect_class
+    return effect_class
+
+
+@register_effect
+class HeartEffect(Effect):
+    name = 'heart'
+    duration = HEART_EFFECT_TICKS
+
+    def start(self, state):
+        state.hearts = min(state.hearts + 1, INITIAL_HEARTS)
+        state.heart_effect = True
+
+    def expire(self, state):
+        state.heart_effect = False
+
+
+@register_effect
+class InvincibleEffect(Effect):
+    name = 'invincible'
+    clock = 'pipes'
+    duration = PIPES_FOR_INVINCIBLE
+
+    def start(self, state):
+        state.invincible = True
+
+    def expire(self, state):
+        state.invincible = False
+
+
+@register_effect
+class WiderGapEffect(Effect):
+    name = 'wider_gap'
+    duration = WIDER_GAP_TICKS
+
+    def start(self, state):
+        state.current_pipe_gap = INITIAL_PIPE_GAP
+        state.wider_gap_effect = True
+
+    def expire(self, state):
+        state.wider_gap_effect = False
+
+
+@register_effect
+class FogEffect(Effect):
+    name = 'foggy'
+    clock = 'pipes'
+    duration = PIPES_FOR_FOGGY
+
+    def start(self, state):
+        state.foggy_mode = True
+
+    def expire(self, state):
+        state.foggy_mode = False
+
+
+class EffectEngine:
+    """Runs active effects and expires them from per-clock timer wheels.
+
+    Each frame costs O(active effects): only active effects are ticked and
+    only the current wheel bucket is checked for expiry.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.active = {}
+        self.wheels = {'ticks': TimerWheel(), 'pipes': TimerWheel()}
+
+    def apply(self, name, duration=None):
+        """Start an effect, or restart its timer if it is already active."""
+        effect = self.active.get(name)
+        if effect is None:
+            effect = EFFECT_TYPES[name]()
+            self.active[name] = effect
+            effect.start(self.state)
+        else:
+            # Restarting replays the start hook (e.g. another heart)
+            effect.start(self.state)
+        wheel = self.wheels[effect.clock]
+        if duration is None:
+            duration = effect.duration
+        effect.deadline = wheel.schedule(effect, wheel.now + duration)
+
+    def is_active(self, name):
+        return name in self.active
+
+    def remaining(self):
+        """Return (name, time left) for each active effect, in its own clock."""
+        return [(name, effect.deadline - self.wheels[effect.clock].now)
+                for name, effect in self.active.items()]
+
+    def restore(self, remaining):
+        """Replace the active effects without running start hooks, e.g. after a resync.
+
+        The state flags the effects set must be restored separately.
+        """
+        self.active = {}
+        self.wheels = {'ticks': TimerWheel(), 'pipes': TimerWheel()}
+        for name, left in remaining:
+            effect = EFFECT_TYPES[name]()
+            wheel = self.wheels[effect.clock]
+            effect.deadline = wheel.schedule(effect, wheel.now + left)
+            self.active[name] = effect
+
+    def advance(self, clock):
+        for effect in self.wheels[clock].advance():
+            # Skip timers left behind when an effect was restarted
+            if effect.deadline == self.wheels[clock].now and self.active.get(effect.name) is effect:
+                del self.active[effect.name]
+                effect.expire(self.state)
+
+    def tick(self):
+        """Advance one frame."""
+        if self.active:
+            for effect in list(self.active.values()):
+                effect.tick(self.state)
+        self.advance('ticks')
+
+    def pipe_passed(self):
+        """Advance the pipes clock by one passed pipe pair."""
+        self.advance('pipes')
+
+
 class BirdColor(Enum):
     YELLOW = "yellow"
     RED = "red"
@@ -83,10 +264,18 @@ class PowerUpType(Enum):
     WIDER_GAP = 3
 
 
+# Effect started when each power-up type is collected
+POWER_UP_EFFECTS = {
+    PowerUpType.HEART: 'heart',
+    PowerUpType.INVINCIBLE: 'invincible',
+    PowerUpType.WIDER_GAP: 'wider_gap'
+}
+
+
 class PowerUp:
-    def __init__(self, x, y):
+    def __init__(self, x, y, rng=random):
         self.rect = pygame.Rect(x, y, POWER_UP_SIZE[0], POWER_UP_SIZE[1])
-        self.type = random.choice(list(PowerUpType))
+        self.type = rng.choice(list(PowerUpType))
         self.collected = False
 
     def move(self, speed):
@@ -104,4 +293,191 @@ class Pipe:
 
     @property
     def off_screen(self):
-        return self.rect.right < -50
\ No newline at end of file
+        return self.rect.right < -50
+
+class GameCore:
+    """The game rules without surfaces, sound or input.
+
+    Owns the game state, bird, pipes, power-ups and event bus, and advances
+    them one frame per step(). FlappyBird draws and plays sounds on top of
+    it; the session server (server.py) runs it as is.
+    """
+
+    def __init__(self, pipe_size=None, course=None):
+        # Pipe gaps and power-ups draw from this game's own generator, so
+        # several games can run side by side on the same seeded course
+        self.rng = random.Random()
+
+        self.state = GameState()
+        self.bird = BirdBody()
+        self.pipe_size = pipe_size  # Size of the current pipe skin's image
+        self.pipe_list = []
+        self.power_ups = []
+        self.unscored_pipes = deque()  # Bottom pipes the bird has yet to pass, oldest first
+        self.frame_count = 0
+
+        # Optional fixed pipe course (see replay.py)
+        self.course = course
+
+        # Game rules react to events emitted by the simulation
+        self.bus = EventBus()
+        self.bus.subscribe(ScoreChanged, lambda event: self.state.update_difficulty())
+        # Effects: invincibility and fog count passed pipes
+        self.bus.subscribe(PipePassed, lambda event: self.state.effects.pipe_passed())
+        self.bus.subscribe(Collision, self.on_collision)
+        self.bus.subscribe(PowerUpCollected, self.apply_power_up)
+
+    def on_collision(self, event):
+        if not event.fatal:
+            # Don't reset position immediately - wait for player input
+            # Clear pipes and setup foggy mode
+            self.pipe_list.clear()
+            self.unscored_pipes.clear()
+            self.state.effects.apply('foggy')
+
+    def apply_power_up(self, event):
+        """Apply power-up effects."""
+        self.state.effects.apply(POWER_UP_EFFECTS[event.power_up_type])
+
+    def create_pipe(self):
+        """Create new pipe obstacles."""
+        pipe_height = self.pipe_size[1]
+
+        # Calculate gap position (leaving space at top and bottom)
+        min_y = 200
+        max_y = SCREEN_HEIGHT - 200
+        gap_y = self.rng.randint(min_y, max_y)
+
+        # Create pipes
+        bottom_pipe = Pipe(SCREEN_WIDTH, gap_y + self.state.current_pipe_gap // 2, True)
+        top_pipe = Pipe(SCREEN_WIDTH, gap_y - self.state.current_pipe_gap // 2 - pipe_height, False)
+
+        bottom_pipe.rect.size = self.pipe_size
+        top_pipe.rect.size = self.pipe_size
+
+        return bottom_pipe, top_pipe
+
+    def create_power_up(self):
+        """Create a new power-up."""
+        random_y = self.rng.randint(200, SCREEN_HEIGHT - 200)
+        return PowerUp(SCREEN_WIDTH, random_y, self.rng)
+
+    def apply_game_event(self, kind):
+        """Apply a simulation event: 'flap', 'pipe' or 'powerup'.
+
+        These are the only inputs that affect a run, so recording them per
+        frame is enough to replay it exactly.
+        """
+        if kind == 'flap':
+            self.flap()
+        elif kind == 'pipe':
+            bottom_pipe, top_pipe = self.create_pipe()
+            self.pipe_list.extend((bottom_pipe, top_pipe))
+            self.unscored_pipes.append(bottom_pipe)
+        elif kind == 'powerup':
+            if self.rng.random() < POWER_UP_SPAWN_CHANCE:
+                self.power_ups.append(self.create_power_up())
+
+    def flap(self):
+        """Flap, resume after a collision, or start a new game."""
+        if self.state.game_active:
+            if self.state.paused:
+                # When game is paused after collision, reset bird position and unpause
+                self.bird.reset_position()
+                self.state.paused = False
+                # Ensure foggy mode is active
+                self.state.effects.apply('foggy')
+            else:
+                self.bird.flap()
+                self.bus.emit(Flapped())
+        else:
+            self.reset_game()
+
+    def reset_game(self):
+        """Reset the game state."""
+        self.state.reset()
+        self.pipe_list.clear()
+        self.power_ups.clear()
+        self.unscored_pipes.clear()
+        self.bird.reset_position()
+        self.bus.emit(ScoreChanged(self.state.score))
+
+        if self.course is not None:
+            self.course.start(self)
+
+    def step(self):
+        """Advance the simulation one frame."""
+        if self.course is not None:
+            self.course.update(self)
+        self.frame_count += 1
+
+        state = self.state
+        if not state.game_active or state.paused:
+            return
+
+        self.bird.update()
+
+        # Move pipes
+        for pipe in self.pipe_list:
+            pipe.move(state.current_speed)
+
+        # Check for score; pipes move in spawn order, so only the oldest
+        # unpassed pipe needs checking
+        unscored = self.unscored_pipes
+        while unscored and unscored[0].rect.centerx < self.bird.rect.centerx:
+            pipe = unscored.popleft()
+            pipe.passed = True
+            state.score += 1
+            self.bus.emit(PipePassed(pipe))
+            self.bus.emit(ScoreChanged(state.score))
+
+        # Clean up off-screen pipes, which are always at the front
+        while self.pipe_list and self.pipe_list[0].off_screen:
+            self.pipe_list.pop(0)
+
+        # Update power-ups
+        for power_up in self.power_ups:
+            if not power_up.collected:
+                power_up.move(state.current_speed)
+        self.power_ups = [p for p in self.power_ups if p.rect.right > -50 and not p.collected]
+
+        # Check collisions
+        state.game_active = self.check_collisions()
+        self.check_power_up_collisions()
+
+        # Update power-up and fog effects
+        state.effects.tick()
+
+    def check_collisions(self):
+        """Check for collisions between bird and obstacles."""
+        if self.state.invincible:
+            return True
+
+        collision_occurred = False
+
+        # Check pipe collisions
+        if check_collision(self.bird.rect, self.pipe_list):
+            collision_occurred = True
+
+        # Check boundary collisions (including ground)
+        if self.bird.rect.top <= 0 or self.bird.rect.bottom >= FLOOR_Y_POS:
+            collision_occurred = True
+            # Ensure bird doesn't go below the floor
+            if self.bird.rect.bottom > FLOOR_Y_POS:
+                self.bird.rect.bottom = FLOOR_Y_POS
+                self.bird.movement = 0
+
+        if collision_occurred:
+            self.state.hearts -= 1
+            self.state.paused = True  # Pause the game on collision
+            self.bus.emit(Collision(self.state.hearts))
+            return self.state.hearts > 0
+
+        return True
+
+    def check_power_up_collisions(self):
+        """Check for collisions with power-ups."""
+        for power_up in self.power_ups:
+            if not power_up.collected and self.bird.rect.colliderect(power_up.rect):
+                power_up.collected = True
+                self.bus.emit(PowerUpCollected(power_up.type))
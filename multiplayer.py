@@ -0,0 +1,634 @@
+# multiplayer.py
+"""Local multiplayer race over UDP with deterministic lockstep.
+
+Every client simulates all players' games on the same seeded Course: its
+own in a full FlappyBird, the others as bare GameCores drawn as ghosts. Only
+flap inputs travel over the network: each client sends its input for a
+future tick to the host, and the host relays one bitmask per tick (one bit
+per player, up to eight players) once every player's input for that tick
+has arrived. Since the simulation is deterministic, every client then
+computes the same state.
+
+Clients send a state hash every SNAPSHOT_INTERVAL ticks. When a hash
+disagrees with player 0's (the authority), the host asks the authority for
+a snapshot, delta-encoded against the last tick the two agreed on, and the
+desynced client restores it and re-simulates to the present.
+
+A player who quits sends a leave message; one the host hasn't heard from
+for PLAYER_TIMEOUT seconds is dropped. Either way the host relays "no
+input" for them from then on, and every tick packet lists the tick each
+departed player went out on, so every client ends their game on the same
+tick and the race carries on.
+
+Usage:
+    python multiplayer.py host --players 2 --port 5005
+    python multiplayer.py join 192.168.1.10:5005
+"""
+import argparse
+import asyncio
+import struct
+import time
+import zlib
+
+import pygame
+from config import *
+from eventbus import ScoreChanged
+from models import EFFECT_TYPES, GameCore, Pipe, PowerUp, PowerUpType
+from render import LAYER_GHOSTS
+from replay import Course
+
+MAX_PLAYERS = 8
+INPUT_DELAY = 3  # Ticks between an input and the tick it applies to
+SNAPSHOT_INTERVAL = 120  # Ticks between state hashes
+SNAPSHOT_HISTORY = 8  # Snapshots kept as delta bases
+NO_BASE = 0xFFFFFFFF  # Base tick of a full (non-delta) snapshot
+JOIN_RETRY = 0.5  # Seconds
+RESEND_INTERVAL = 0.05  # Seconds without progress before inputs are resent
+PLAYER_TIMEOUT = 5.0  # Seconds of silence before the host drops a player
+
+MSG_JOIN = b'J'
+MSG_WELCOME = b'W'
+MSG_INPUT = b'I'
+MSG_TICKS = b'T'
+MSG_HASH = b'H'
+MSG_RESYNC = b'Q'
+MSG_SNAPSHOT = b'S'
+MSG_LEAVE = b'L'
+
+WELCOME = struct.Struct('<BBI')  # player id, player count, seed
+INPUT = struct.Struct('<BII')  # player id, next tick wanted, first input tick; then one byte per tick
+TICKS = struct.Struct('<IB')  # first tick, departures; then a DEPARTURE each and one bitmask byte per tick
+DEPARTURE = struct.Struct('<BI')  # player id, first tick the player is out
+HASH = struct.Struct('<BII')  # player id, tick, crc32
+RESYNC = struct.Struct('<BII')  # target player, tick, base tick
+SNAPSHOT = struct.Struct('<BII')  # target player, tick, base tick; then zlib(xor delta)
+LEAVE = struct.Struct('<B')  # player id
+
+FLAP = 1
+
+
+# Game state snapshots
+
+GAME_HEADER = struct.Struct('<BbHhhddhII')
+EFFECT_ENTRY = struct.Struct('<BH')
+PIPE_ENTRY = struct.Struct('<hhB')
+POWER_UP_ENTRY = struct.Struct('<hhBB')
+RNG_STATE = struct.Struct('<625I')
+COUNT = struct.Struct('<B')
+LENGTH = struct.Struct('<H')
+WORLD_HEADER = struct.Struct('<IB')
+
+EFFECT_NAMES = sorted(EFFECT_TYPES)
+STATE_FLAGS = ('game_active', 'paused', 'invincible', 'foggy_mode', 'heart_effect', 'wider_gap_effect')
+
+
+def encode_game_state(game):
+    """Pack everything a game's simulation depends on into bytes.
+
+    Works for a GameCore or a FlappyBird: nothing drawn (like the bird's
+    animation frame) is included, so every client encodes a player alike.
+    """
+    state = game.state
+    flags = 0
+    for bit, name in enumerate(STATE_FLAGS):
+        flags |= getattr(state, name) << bit
+
+    bird = game.bird
+    data = [GAME_HEADER.pack(
+        flags, state.hearts, state.score, bird.rect.centerx, bird.rect.centery,
+        bird.movement, state.current_speed, state.current_pipe_gap,
+        game.frame_count, game.course.start_frame
+    )]
+
+    effects = state.effects.remaining()
+    data.append(COUNT.pack(len(effects)))
+    data.extend(EFFECT_ENTRY.pack(EFFECT_NAMES.index(name), left) for name, left in effects)
+
+    data.append(COUNT.pack(len(game.pipe_list)))
+    data.extend(PIPE_ENTRY.pack(pipe.rect.x, pipe.rect.y, pipe.is_bottom | pipe.passed << 1)
+                for pipe in game.pipe_list)
+
+    data.append(COUNT.pack(len(game.power_ups)))
+    data.extend(POWER_UP_ENTRY.pack(p.rect.x, p.rect.y, p.type.value, p.collected)
+                for p in game.power_ups)
+
+    version, internal, gauss_next = game.rng.getstate()
+    data.append(RNG_STATE.pack(*internal))
+    return b''.join(data)
+
+
+def restore_game_state(game, data):
+    """Inverse of encode_game_state. Doesn't refresh a FlappyBird's score display."""
+    state = game.state
+    (flags, state.hearts, state.score, centerx, centery, movement,
+     state.current_speed, state.current_pipe_gap, game.frame_count,
+     game.course.start_frame) = GAME_HEADER.unpack_from(data)
+    offset = GAME_HEADER.size
+    for bit, name in enumerate(STATE_FLAGS):
+        setattr(state, name, bool(flags >> bit & 1))
+
+    bird = game.bird
+    bird.movement = movement
+    bird.rect.center = (centerx, centery)
+
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    effects = []
+    for _ in range(count):
+        index, left = EFFECT_ENTRY.unpack_from(data, offset)
+        offset += EFFECT_ENTRY.size
+        effects.append((EFFECT_NAMES[index], left))
+    state.effects.restore(effects)
+
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    pipe_size = game.pipe_size
+    game.pipe_list = []
+    for _ in range(count):
+        x, y, pipe_flags = PIPE_ENTRY.unpack_from(data, offset)
+        offset += PIPE_ENTRY.size
+        pipe = Pipe(x, y, bool(pipe_flags & 1))
+        pipe.passed = bool(pipe_flags & 2)
+        pipe.rect.size = pipe_size
+        game.pipe_list.append(pipe)
+    game.unscored_pipes.clear()
+    game.unscored_pipes.extend(p for p in game.pipe_list if p.is_bottom and not p.passed)
+
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    game.power_ups = []
+    for _ in range(count):
+        x, y, type_value, collected = POWER_UP_ENTRY.unpack_from(data, offset)
+        offset += POWER_UP_ENTRY.size
+        power_up = PowerUp(x, y, game.rng)
+        power_up.type = PowerUpType(type_value)
+        power_up.collected = bool(collected)
+        game.power_ups.append(power_up)
+
+    game.rng.setstate((3, RNG_STATE.unpack_from(data, offset), None))
+
+
+def xor_bytes(data, base):
+    """XOR data with base, padding or truncating base to data's length."""
+    base = base[:len(data)].ljust(len(data), b'\0')
+    return (int.from_bytes(data, 'little') ^ int.from_bytes(base, 'little')).to_bytes(len(data), 'little')
+
+
+def encode_delta(snapshot, base=b''):
+    """Delta-compress a snapshot against a base snapshot the receiver already has."""
+    return zlib.compress(xor_bytes(snapshot, base))
+
+
+def decode_delta(payload, base=b''):
+    return xor_bytes(zlib.decompress(payload), base)
+
+
+# Simulation
+
+class RemoteBirds:
+    """Draws the other players' birds as translucent ghosts in the local game.
+
+    Remote games are GameCores, whose birds have no images, so they are
+    drawn with ghost copies of the local bird's frames, flapping in step.
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self.frames = []
+
+    def attach(self, game):
+        from ghosts import make_ghost_frames
+        self.frames = make_ghost_frames(game.bird.frames)
+
+    def draw(self, queue, game):
+        image = self.frames[(self.world.tick // 10) % len(self.frames)]
+        for other in self.world.games:
+            if other is not game and other.state.game_active:
+                queue.submit(image, other.bird.rect, layer=LAYER_GHOSTS)
+
+
+class RaceWorld:
+    """Every player's game, stepped together one tick at a time."""
+
+    def __init__(self, seed, player_count, local_id):
+        from game import FlappyBird
+
+        self.seed = seed
+        self.local_id = local_id
+        self.tick = 0
+        local_game = FlappyBird(course=Course(seed), rivals=RemoteBirds(self))
+        self.games = []
+        for player in range(player_count):
+            if player == local_id:
+                game = local_game
+            else:
+                game = GameCore(local_game.pipe_size, Course(seed))
+            game.reset_game()
+            self.games.append(game)
+
+    @property
+    def local_game(self):
+        return self.games[self.local_id]
+
+    @property
+    def finished(self):
+        return not any(game.state.game_active for game in self.games)
+
+    def step(self, mask, departed=0):
+        """Apply one tick of inputs (bit i set = player i flapped) and update every game.
+
+        Players with their bit set in departed left the race at this tick;
+        their games end as if they had crashed out.
+        """
+        for player, game in enumerate(self.games):
+            if departed >> player & 1:
+                game.state.game_active = False
+            # Players who are out stay out; a flap would restart their game
+            if mask >> player & 1 and game.state.game_active:
+                game.apply_game_event('flap')
+            if player == self.local_id:
+                game.update()
+            else:
+                game.step()
+        self.tick += 1
+
+    def snapshot(self):
+        data = [WORLD_HEADER.pack(self.tick, len(self.games))]
+        for game in self.games:
+            state = encode_game_state(game)
+            data.append(LENGTH.pack(len(state)))
+            data.append(state)
+        return b''.join(data)
+
+    def restore(self, data):
+        self.tick, count = WORLD_HEADER.unpack_from(data)
+        offset = WORLD_HEADER.size
+        for game in self.games:
+            length, = LENGTH.unpack_from(data, offset)
+            offset += LENGTH.size
+            restore_game_state(game, data[offset:offset + length])
+            offset += length
+        local_game = self.local_game
+        local_game.update_score_display(ScoreChanged(local_game.state.score))
+
+
+# Network
+
+class LockstepHost(asyncio.DatagramProtocol):
+    """Relays per-tick inputs between clients. Does not simulate anything."""
+
+    def __init__(self, player_count, seed=None):
+        if not 1 <= player_count <= MAX_PLAYERS:
+            raise ValueError(f"player_count must be between 1 and {MAX_PLAYERS}")
+        self.player_count = player_count
+        self.seed = Course(seed).seed
+        self.transport = None
+        self.players = []  # Client addresses by player id
+        self.last_heard = {}  # player -> time.monotonic() of their last datagram
+        self.departed = set()  # Players who left or timed out
+        self.out_at = {}  # Departed player -> first tick relayed without their input
+        self.inputs = {}  # tick -> per-player input bytes (None until received)
+        self.masks = bytearray()  # Relayed bitmask for every tick so far
+        self.hashes = {}  # tick -> {player: crc}
+        self.agreed = {}  # player -> last tick whose hash matched the authority's
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def send(self, data, addr):
+        self.bytes_sent += len(data)
+        self.transport.sendto(data, addr)
+
+    def datagram_received(self, data, addr):
+        self.bytes_received += len(data)
+        kind, body = data[:1], data[1:]
+        if kind == MSG_JOIN:
+            self.handle_join(addr)
+            return
+
+        # Everything else must come from a joined player, who can only speak for itself
+        if addr not in self.players:
+            return
+        player = self.players.index(addr)
+        if player in self.departed:
+            return
+        self.last_heard[player] = time.monotonic()
+        try:
+            if kind == MSG_INPUT:
+                self.handle_input(body, player, addr)
+            elif kind == MSG_HASH:
+                self.handle_hash(body, player)
+            elif kind == MSG_SNAPSHOT and player == 0:
+                # Only the authority sends snapshots
+                target, tick, base_tick = SNAPSHOT.unpack_from(body)
+                if 0 < target < len(self.players):
+                    self.send(data, self.players[target])
+            elif kind == MSG_LEAVE:
+                sender, = LEAVE.unpack_from(body)
+                if sender == player:
+                    self.drop(player, "left")
+        except struct.error:
+            pass  # Short or malformed datagram
+        self.check_timeouts(self.last_heard[player])
+
+    def check_timeouts(self, now):
+        """Drop players not heard from for PLAYER_TIMEOUT seconds.
+
+        Checked on every datagram: players still racing resend their inputs
+        while they wait, so the check runs as long as anyone is waiting.
+        """
+        if len(self.players) < self.player_count:
+            return  # Not started; a player may still be waiting for the others
+        for player, heard in self.last_heard.items():
+            if player not in self.departed and now - heard > PLAYER_TIMEOUT:
+                self.drop(player, "timed out")
+
+    def drop(self, player, reason):
+        """Relay no input for a player from now on, and end their game for everyone."""
+        if player in self.departed:
+            return
+        self.departed.add(player)
+        print(f"Player {player + 1} {reason}")
+        first_new = len(self.masks)
+        self.relay()
+        if len(self.masks) > first_new:
+            self.broadcast(first_new)
+
+    def handle_join(self, addr):
+        if addr not in self.players:
+            if len(self.players) >= self.player_count:
+                return
+            self.players.append(addr)
+        self.last_heard[self.players.index(addr)] = time.monotonic()
+        if len(self.players) == self.player_count:
+            # Everyone is here: (re)send each player its welcome
+            for player, player_addr in enumerate(self.players):
+                self.send(MSG_WELCOME + WELCOME.pack(player, self.player_count, self.seed), player_addr)
+
+    def handle_input(self, body, player, addr):
+        sender, wanted, first_tick = INPUT.unpack_from(body)
+        if sender != player:
+            return
+        for i, flags in enumerate(body[INPUT.size:]):
+            tick = first_tick + i
+            if tick >= len(self.masks):
+                inputs = self.inputs.setdefault(tick, [None] * self.player_count)
+                inputs[player] = flags
+
+        first_new = len(self.masks)
+        self.relay()
+        if len(self.masks) > first_new:
+            self.broadcast(first_new)
+        elif wanted < len(self.masks):
+            # The client is behind, e.g. after a lost packet: resend what it is missing
+            self.send(self.ticks_packet(wanted, min(len(self.masks), wanted + 255)), addr)
+
+    def relay(self):
+        """Turn every tick whose inputs are all in (or departed) into a bitmask."""
+        while len(self.masks) in self.inputs:
+            tick = len(self.masks)
+            inputs = self.inputs[tick]
+            if any(flags is None and player not in self.departed for player, flags in enumerate(inputs)):
+                return
+            del self.inputs[tick]
+            mask = 0
+            for player, flags in enumerate(inputs):
+                if flags is None:
+                    self.out_at.setdefault(player, tick)
+                    flags = 0
+                mask |= (flags & FLAP) << player
+            self.masks.append(mask)
+
+    def ticks_packet(self, first, end):
+        """Bitmasks for ticks first..end, with every departure so far."""
+        departures = [DEPARTURE.pack(player, tick) for player, tick in sorted(self.out_at.items())]
+        return (MSG_TICKS + TICKS.pack(first, len(departures)) + b''.join(departures)
+                + bytes(self.masks[first:end]))
+
+    def broadcast(self, first):
+        packet = self.ticks_packet(first, len(self.masks))
+        for player, player_addr in enumerate(self.players):
+            if player not in self.departed:
+                self.send(packet, player_addr)
+
+    def handle_hash(self, body, player):
+        sender, tick, crc = HASH.unpack_from(body)
+        if sender != player:
+            return
+        hashes = self.hashes.setdefault(tick, {})
+        hashes[player] = crc
+        authority = hashes.get(0)
+        if authority is None:
+            return
+
+        for other, other_crc in list(hashes.items()):
+            if other == 0:
+                continue
+            if other_crc == authority:
+                self.agreed[other] = tick
+            else:
+                base = self.agreed.get(other, NO_BASE)
+                if tick - base > SNAPSHOT_INTERVAL * (SNAPSHOT_HISTORY - 1):
+                    base = NO_BASE  # The authority no longer has that snapshot
+                self.send(MSG_RESYNC + RESYNC.pack(other, tick, base), self.players[0])
+            del hashes[other]
+
+        if len(hashes) == 1 and len(self.hashes) > SNAPSHOT_HISTORY:
+            for old in sorted(self.hashes)[:-SNAPSHOT_HISTORY]:
+                del self.hashes[old]
+
+
+class LockstepClient(asyncio.DatagramProtocol):
+    """One player's connection: sends local inputs, steps the world as ticks arrive."""
+
+    def __init__(self):
+        self.transport = None
+        self.world = None
+        self.welcomed = asyncio.Event()
+        self.player_id = None
+        self.masks = bytearray()  # Relayed bitmask for every tick received so far
+        self.out_at = {}  # Departed player -> first tick they are out
+        self.inputs = bytearray()  # Local input for every tick so far
+        self.pending_flap = False
+        self.last_send = 0.0
+        self.snapshots = {}  # tick -> snapshot bytes
+        self.resyncs = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        kind, body = data[:1], data[1:]
+        if kind == MSG_WELCOME:
+            if self.world is None:
+                self.player_id, player_count, seed = WELCOME.unpack_from(body)
+                self.world = RaceWorld(seed, player_count, self.player_id)
+                self.welcomed.set()
+        elif kind == MSG_TICKS:
+            first_tick, count = TICKS.unpack_from(body)
+            offset = TICKS.size
+            for _ in range(count):
+                player, tick = DEPARTURE.unpack_from(body, offset)
+                offset += DEPARTURE.size
+                self.out_at.setdefault(player, tick)
+            masks = body[offset:]
+            if first_tick <= len(self.masks) < first_tick + len(masks):
+                self.masks.extend(masks[len(self.masks) - first_tick:])
+        elif kind == MSG_RESYNC:
+            self.send_snapshot(body)
+        elif kind == MSG_SNAPSHOT:
+            self.apply_snapshot(body)
+
+    async def join(self):
+        """Join the host and wait for the race to start."""
+        while not self.welcomed.is_set():
+            self.transport.sendto(MSG_JOIN)
+            try:
+                await asyncio.wait_for(self.welcomed.wait(), JOIN_RETRY)
+            except asyncio.TimeoutError:
+                pass
+
+    def leave(self):
+        """Tell the host we're gone, so the race goes on without us."""
+        if self.player_id is not None:
+            self.transport.sendto(MSG_LEAVE + LEAVE.pack(self.player_id))
+
+    def flap(self):
+        """Register a local flap for the next input tick."""
+        self.pending_flap = True
+
+    def send_input(self, now):
+        """Queue this frame's input, if within the input delay, and send unconfirmed inputs."""
+        if len(self.inputs) < self.world.tick + INPUT_DELAY:
+            self.inputs.append(FLAP if self.pending_flap else 0)
+            self.pending_flap = False
+        elif now - self.last_send < RESEND_INTERVAL:
+            return
+        self.last_send = now
+
+        # Send every input the host may not have yet
+        first = len(self.masks)
+        self.transport.sendto(MSG_INPUT + INPUT.pack(self.player_id, len(self.masks), first)
+                              + bytes(self.inputs[first:]))
+
+    def advance(self):
+        """Step the world through every tick received so far."""
+        world = self.world
+        while world.tick < len(self.masks) and not world.finished:
+            departed = 0
+            for player, tick in self.out_at.items():
+                if tick == world.tick:
+                    departed |= 1 << player
+            world.step(self.masks[world.tick], departed)
+            if world.tick % SNAPSHOT_INTERVAL == 0:
+                self.take_snapshot()
+
+    def take_snapshot(self):
+        snapshot = self.world.snapshot()
+        self.snapshots[self.world.tick] = snapshot
+        for old in sorted(self.snapshots)[:-SNAPSHOT_HISTORY]:
+            del self.snapshots[old]
+        self.transport.sendto(MSG_HASH + HASH.pack(self.player_id, self.world.tick, zlib.crc32(snapshot)))
+
+    def send_snapshot(self, body):
+        """Authority: answer the host's resync request for another player."""
+        target, tick, base_tick = RESYNC.unpack_from(body)
+        snapshot = self.snapshots.get(tick)
+        if snapshot is None:
+            return
+        base = self.snapshots.get(base_tick)
+        if base is None:
+            base, base_tick = b'', NO_BASE
+        self.transport.sendto(MSG_SNAPSHOT + SNAPSHOT.pack(target, tick, base_tick)
+                              + encode_delta(snapshot, base))
+
+    def apply_snapshot(self, body):
+        target, tick, base_tick = SNAPSHOT.unpack_from(body)
+        base = b'' if base_tick == NO_BASE else self.snapshots.get(base_tick)
+        if base is None or tick > self.world.tick:
+            return
+        snapshot = decode_delta(body[SNAPSHOT.size:], base)
+
+        # Restore the authority's state and re-simulate to where we were
+        self.world.restore(snapshot)
+        self.snapshots[tick] = snapshot
+        self.resyncs += 1
+        self.advance()
+
+
+def read_local_flap(client):
+    """Handle window events; returns False when the window is closed."""
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            return False
+        if (event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE) or \
+                (event.type == pygame.MOUSEBUTTONDOWN and event.button == 1):
+            client.flap()
+    return True
+
+
+async def play(host, port, headless=False, bot=None):
+    """Join a race and play it; bot(game) -> bool replaces keyboard input when given."""
+    loop = asyncio.get_running_loop()
+    transport, client = await loop.create_datagram_endpoint(LockstepClient, remote_addr=(host, port))
+    try:
+        await client.join()
+        world = client.world
+        game = world.local_game
+        while not world.finished:
+            frame_start = loop.time()
+            if bot is not None:
+                if bot(game):
+                    client.flap()
+            elif not read_local_flap(client):
+                break
+            client.send_input(frame_start)
+            client.advance()
+            if not headless:
+                game.draw()
+                pygame.display.update()
+                await asyncio.sleep(max(0.0, 1 / FPS - (loop.time() - frame_start)))
+            else:
+                await asyncio.sleep(0)
+        return client
+    finally:
+        client.leave()
+        transport.close()
+
+
+async def serve(port, player_count, seed=None):
+    loop = asyncio.get_running_loop()
+    transport, host = await loop.create_datagram_endpoint(
+        lambda: LockstepHost(player_count, seed), local_addr=('0.0.0.0', port))
+    print(f"Hosting a {player_count}-player race on UDP port {port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        transport.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local multiplayer race.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    host_parser = commands.add_parser('host', help='Relay inputs for a race')
+    host_parser.add_argument('--players', type=int, default=2)
+    host_parser.add_argument('--port', type=int, default=5005)
+    host_parser.add_argument('--seed', type=int, default=None)
+    join_parser = commands.add_parser('join', help='Join a race as a player')
+    join_parser.add_argument('address', help='HOST:PORT')
+    args = parser.parse_args()
+
+    if args.command == 'host':
+        asyncio.run(serve(args.port, args.players, args.seed))
+    else:
+        host, port = args.address.rsplit(':', 1)
+        client = asyncio.run(play(host, int(port)))
+        if client.world is not None:
+            scores = ', '.join(f"P{i + 1}: {g.state.score}" for i, g in enumerate(client.world.games))
+            print(f"Race over - {scores}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# render.py
+"""Render queue: collect blits for a frame and flush them in batches.
+
+Drawing code submits (surface, dest, area, layer, flags) commands instead of
+blitting straight to the screen. On flush the commands are grouped by layer,
+identical commands within a layer are merged, and each layer is drawn with a
+single Surface.blits call.
+"""
+
+# Draw order, back to front
+LAYER_BACKGROUND = 0
+LAYER_PIPES = 10
+LAYER_POWER_UPS = 20
+LAYER_EFFECTS = 30
+LAYER_GHOSTS = 40
+LAYER_SPRITES = 50
+LAYER_FLOOR = 55
+LAYER_HUD = 60
+LAYER_FOG = 70
+LAYER_MENU = 80
+LAYER_MENU_TEXT = 90
+
+
+class RenderQueue:
+    def __init__(self):
+        self.layers = {}
+        self.submitted = 0
+        # Counts from the last flush: commands submitted, blitted, merged away
+        # and Surface.blits calls made
+        self.stats = {'submitted': 0, 'blitted': 0, 'merged': 0, 'calls': 0}
+
+    def submit(self, surface, dest, area=None, layer=LAYER_SPRITES, flags=0):
+        """Queue a blit of surface at dest (a point or Rect) on the given layer."""
+        dest = (dest[0], dest[1])
+        if area is not None:
+            area = tuple(area)
+        key = (id(surface), dest, area, flags)
+        commands = self.layers.get(layer)
+        if commands is None:
+            commands = self.layers[layer] = {}
+        # Later duplicates are dropped; first submission keeps its draw order
+        if key not in commands:
+            commands[key] = (surface, dest, area, flags)
+        self.submitted += 1
+
+    def submit_many(self, surface, dests, layer=LAYER_SPRITES):
+        """Queue the same surface at each of several points."""
+        commands = self.layers.get(layer)
+        if commands is None:
+            commands = self.layers[layer] = {}
+        surface_id = id(surface)
+        for dest in dests:
+            key = (surface_id, dest, None, 0)
+            if key not in commands:
+                commands[key] = (surface, dest, None, 0)
+            self.submitted += 1
+
+    def submit_sprites(self, group, layer=LAYER_SPRITES):
+        """Queue every sprite in a pygame sprite group."""
+        for sprite in group.sprites():
+            self.submit(sprite.image, sprite.rect, layer=layer)
+
+    def flush(self, screen):
+        """Draw all queued commands to screen, back to front, and clear the queue."""
+        blitted = 0
+        for layer in sorted(self.layers):
+            commands = list(self.layers[layer].values())
+            screen.blits(commands, False)
+            blitted += len(commands)
+
+        self.stats = {
+            'submitted': self.submitted,
+            'blitted': blitted,
+            'merged': self.submitted - blitted,
+            'calls': len(self.layers)
+        }
+        self.layers = {}
+        self.submitted = 0
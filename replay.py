@@ -0,0 +1,187 @@
+# replay.py
+import json
+import os
+import random
+import time
+
+import pygame
+from config import *
+
+
+class Recording:
+    """A recorded run: the random seed, customization and per-frame events.
+
+    Pipe gaps and power-ups come from the game's seeded generator, so the seed
+    plus the frames at which 'flap', 'pipe' and 'powerup' events happened is
+    enough to reproduce the run exactly.
+    """
+
+    def __init__(self, seed, settings, events=None, length=0, score=0):
+        self.seed = seed
+        self.settings = dict(settings)
+        self.events = list(events or [])  # [(frame, kind), ...] in order
+        self.length = length  # Number of update() calls in the run
+        self.score = score
+
+    def events_by_frame(self):
+        """Group events by frame index."""
+        frames = {}
+        for frame, kind in self.events:
+            frames.setdefault(frame, []).append(kind)
+        return frames
+
+    def to_dict(self):
+        return {
+            'seed': self.seed,
+            'settings': self.settings,
+            'events': [list(event) for event in self.events],
+            'length': self.length,
+            'score': self.score
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['seed'],
+            data['settings'],
+            [tuple(event) for event in data['events']],
+            data['length'],
+            data.get('score', 0)
+        )
+
+    def save(self, path, exclusive=False):
+        """Write the recording; with exclusive=True, raise FileExistsError rather than overwrite."""
+        with open(path, 'x' if exclusive else 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+class Recorder:
+    """Records runs of a live FlappyBird game and saves them on game over."""
+
+    def __init__(self, directory=None, seed=None):
+        self.directory = directory
+        self.seed = seed  # Fixed course seed, e.g. for ghost races
+        self.recording = None
+        self.start_frame = 0
+        self.finished = []
+
+    def start(self, game):
+        """Begin a new recording. Called by FlappyBird.reset_game."""
+        seed = self.seed if self.seed is not None else random.randrange(2 ** 32)
+        game.rng.seed(seed)
+        settings = {
+            'bird_color': game.state.current_bird,
+            'background': game.state.current_bg,
+            'pipe_color': game.state.current_pipe
+        }
+        self.recording = Recording(seed, settings)
+        self.start_frame = game.frame_count
+
+    def record(self, frame, kind):
+        if self.recording is not None:
+            self.recording.events.append((frame - self.start_frame, kind))
+
+    def finish(self, game):
+        """Close the current recording. Called when the game ends."""
+        if self.recording is None:
+            return
+        self.recording.length = game.frame_count - self.start_frame
+        self.recording.score = game.state.score
+        self.finished.append(self.recording)
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            # Runs ending in the same second with the same score get a counter
+            stem = 'run-{}-{}'.format(int(time.time()), self.recording.score)
+            name, counter = stem + '.json', 1
+            while True:
+                try:
+                    self.recording.save(os.path.join(self.directory, name), exclusive=True)
+                    break
+                except FileExistsError:
+                    counter += 1
+                    name = '{}-{}.json'.format(stem, counter)
+
+        self.recording = None
+
+
+class ReplayPlayer:
+    """Drives a FlappyBird instance through a recording frame by frame."""
+
+    def __init__(self, game, recording):
+        self.game = game
+        self.recording = recording
+        self.events = recording.events_by_frame()
+        self.frame = 0
+
+        # Restore the customization the run was recorded with
+        settings = recording.settings
+        game.state.current_bird = settings['bird_color']
+        game.state.current_bg = settings['background']
+        game.state.current_pipe = settings['pipe_color']
+        game.setup_sprites()
+
+        game.reset_game()
+        game.rng.seed(recording.seed)
+
+    @property
+    def finished(self):
+        return self.frame >= self.recording.length
+
+    def step(self):
+        """Apply this frame's recorded events and advance the simulation."""
+        for kind in self.events.get(self.frame, ()):
+            self.game.apply_game_event(kind)
+        self.game.update()
+        self.frame += 1
+
+    def seek(self, frame):
+        """Fast-forward to the given frame without drawing."""
+        while self.frame < frame and not self.finished:
+            self.step()
+
+
+class Course:
+    """A fixed pipe course: one seed, with pipes and power-ups spawned on a
+    fixed frame schedule instead of wall-clock timers.
+
+    Every game started on the same course sees the same pipes, which is what
+    ghost races and multiplayer races need. Use one Course per game.
+    """
+
+    def __init__(self, seed=None):
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.pipe_interval = PIPE_SPAWN_TIME * FPS // 1000
+        self.power_up_interval = POWER_UP_SPAWN_TIME * FPS // 1000
+        self.start_frame = 0
+
+    def attach(self, game):
+        # Pipes and power-ups come from the fixed schedule, not timers
+        pygame.time.set_timer(EVENTS['SPAWNPIPE'], 0)
+        pygame.time.set_timer(EVENTS['SPAWNPOWERUP'], 0)
+        if game.recorder is not None:
+            game.recorder.seed = self.seed
+
+    def start(self, game):
+        """Restart the course. Called by GameCore.reset_game."""
+        game.rng.seed(self.seed)
+        self.start_frame = game.frame_count
+
+    def frame(self, game):
+        """Frames since the course started."""
+        return game.frame_count - self.start_frame
+
+    def update(self, game):
+        """Spawn this frame's pipes and power-ups."""
+        if not game.state.game_active or game.state.paused:
+            return
+        frame = self.frame(game)
+        if frame % self.pipe_interval == 0:
+            game.apply_game_event('pipe')
+        if frame % self.power_up_interval == 0:
+            game.apply_game_event('powerup')
@@ -0,0 +1,360 @@
+# server.py
+"""Session server: many independent headless games in one process.
+
+Each connected client gets a Session running a GameCore (models.py: the
+same rules FlappyBird plays by, with no surfaces or window) on its own
+seeded Course. One asyncio tick scheduler steps every session due on the
+same tick together, then sends each client a compact binary state frame.
+
+Clients connect over WebSocket (browsers; send JSON such as
+{"type": "flap"}) or a local Unix socket (send one opcode byte per input).
+Frames are WebSocket binary messages, or length-prefixed on the Unix socket.
+
+Back-pressure: inputs queue per session up to INPUT_QUEUE_LIMIT (oldest
+dropped); a frame is skipped when the client's write buffer is over
+WRITE_HIGH_WATER, and a client that stays backed up for SLOW_CLIENT_TIMEOUT
+seconds is disconnected. Per-session memory is estimated every second and
+sessions over MAX_SESSION_BYTES are closed. New sessions are refused at the
+session cap and for a while after any tick overruns its 1/FPS budget.
+
+Usage:
+    python server.py --ws-port 8765 --unix /tmp/flappy.sock
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import sys
+from collections import deque
+
+from config import *
+from models import GameCore
+from replay import Course
+from skins import SkinRegistry
+
+MAX_SESSIONS = 500  # Stepped in about half a 1/FPS tick with all playing; run more processes beyond that
+ADMISSION_COOLDOWN = FPS  # Ticks after an overrun during which new sessions are refused
+INPUT_QUEUE_LIMIT = 16
+WRITE_HIGH_WATER = 64 * 1024  # Bytes buffered for a client before frames are skipped
+SLOW_CLIENT_TIMEOUT = 5.0  # Seconds
+MAX_SESSION_BYTES = 256 * 1024
+MEMORY_SAMPLE_TICKS = FPS  # Ticks between memory estimates
+
+OP_FLAP = 1
+
+FRAME_HEADER = struct.Struct('<IHbBhBB')  # tick, score, hearts, flags, bird y, pipe pairs, power-ups
+FRAME_PIPE = struct.Struct('<hhh')  # x, gap top, gap bottom
+FRAME_POWER_UP = struct.Struct('<hhB')  # x, y, type
+FRAME_LENGTH = struct.Struct('<H')
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+def object_size(obj):
+    """Rough size in bytes of an object and its attribute dict."""
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+class Session:
+    def __init__(self, session_id, connection, pipe_size, seed=None, tick_interval=1):
+        self.id = session_id
+        self.connection = connection
+        # Pipes and power-ups spawn on the fixed course schedule from a seeded
+        # generator, so a session is deterministic given its seed and inputs
+        self.game = GameCore(pipe_size, Course(seed))
+        self.inputs = deque(maxlen=INPUT_QUEUE_LIMIT)
+        self.tick_interval = tick_interval
+        self.closed = False
+        self.memory = 0
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.backed_up_since = None
+
+    def queue_input(self, opcode):
+        self.inputs.append(opcode)
+
+    def step(self):
+        while self.inputs:
+            if self.inputs.popleft() == OP_FLAP:
+                self.game.apply_game_event('flap')
+        self.game.step()
+
+    def encode_frame(self, tick):
+        """Compact state frame for thin clients."""
+        game = self.game
+        state = game.state
+        flags = state.game_active | state.paused << 1 | state.invincible << 2 | state.foggy_mode << 3
+        pairs = len(game.pipe_list) // 2
+        data = [FRAME_HEADER.pack(tick, state.score, state.hearts, flags, game.bird.rect.centery,
+                                  pairs, sum(not p.collected for p in game.power_ups))]
+        pipes = game.pipe_list
+        for i in range(0, pairs * 2, 2):
+            data.append(FRAME_PIPE.pack(pipes[i].rect.x, pipes[i + 1].rect.bottom, pipes[i].rect.top))
+        data.extend(FRAME_POWER_UP.pack(p.rect.x, p.rect.y, p.type.value)
+                    for p in game.power_ups if not p.collected)
+        return b''.join(data)
+
+    def measure_memory(self):
+        """Estimate the bytes held by this session's game and queues."""
+        game = self.game
+        size = object_size(self) + object_size(game) + object_size(game.state) + object_size(game.bird)
+        size += object_size(game.state.effects) + sys.getsizeof(self.inputs)
+        size += 2500  # Mersenne Twister state
+        for item in game.pipe_list + game.power_ups:
+            size += object_size(item) + sys.getsizeof(item.rect)
+        size += sys.getsizeof(game.pipe_list) + sys.getsizeof(game.power_ups)
+        if self.connection is not None:
+            size += self.connection.buffered()
+        self.memory = size
+        return size
+
+
+class Connection:
+    """Base for client transports; subclasses encode frames and parse inputs."""
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def buffered(self):
+        transport = self.writer.transport
+        return 0 if transport.is_closing() else transport.get_write_buffer_size()
+
+    def send_frame(self, frame):
+        raise NotImplementedError
+
+    def close(self):
+        if not self.writer.transport.is_closing():
+            self.writer.close()
+
+
+class UnixConnection(Connection):
+    async def read_inputs(self, reader, session):
+        while True:
+            data = await reader.read(64)
+            if not data:
+                return
+            for opcode in data:
+                session.queue_input(opcode)
+
+    def send_frame(self, frame):
+        self.writer.write(FRAME_LENGTH.pack(len(frame)) + frame)
+
+
+class WebSocketConnection(Connection):
+    """Minimal RFC 6455 server side: unfragmented text/binary frames, ping, close."""
+
+    @staticmethod
+    async def handshake(reader, writer):
+        request = await reader.readuntil(b'\r\n\r\n')
+        headers = {}
+        for line in request.decode('latin-1').split('\r\n')[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        key = headers.get('sec-websocket-key')
+        if key is None:
+            writer.write(b'HTTP/1.1 400 Bad Request\r\n\r\n')
+            return False
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                      'Connection: Upgrade\r\nSec-WebSocket-Accept: {}\r\n\r\n').format(accept).encode())
+        return True
+
+    @staticmethod
+    def encode(opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        return header + payload
+
+    async def read_inputs(self, reader, session):
+        while True:
+            first, second = await reader.readexactly(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length, = struct.unpack('!H', await reader.readexactly(2))
+            elif length == 127:
+                length, = struct.unpack('!Q', await reader.readexactly(8))
+            if length > 4096:
+                return  # Inputs are tiny; refuse anything else
+            mask = await reader.readexactly(4) if second & 0x80 else b'\0\0\0\0'
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(await reader.readexactly(length)))
+
+            if opcode == 0x8:  # Close
+                return
+            if opcode == 0x9:  # Ping
+                self.writer.write(self.encode(0xA, payload))
+            elif opcode == 0x1:
+                try:
+                    message = json.loads(payload)
+                except ValueError:
+                    continue
+                if isinstance(message, dict) and message.get('type') == 'flap':
+                    session.queue_input(OP_FLAP)
+            elif opcode == 0x2:
+                for opcode in payload:
+                    session.queue_input(opcode)
+
+    def send_frame(self, frame):
+        self.writer.write(self.encode(0x2, frame))
+
+
+class SessionServer:
+    def __init__(self, max_sessions=MAX_SESSIONS, pipe_skin=DEFAULT_SETTINGS['pipe_color']):
+        self.max_sessions = max_sessions
+        # Pipes are as big as the skin clients draw them with
+        self.pipe_size = SkinRegistry().pipe_size(pipe_skin)
+        self.sessions = {}
+        self.schedule = {}  # tick -> sessions due on that tick
+        self.tick = 0
+        self.next_id = 0
+        self.overruns = 0
+        self.last_overrun = None  # Tick of the most recent overrun
+        self.rejected = 0
+
+    def open_session(self, connection, seed=None, tick_interval=1):
+        """Create a session, or return None when the server is full or falling behind."""
+        if len(self.sessions) >= self.max_sessions or self.overloaded():
+            self.rejected += 1
+            return None
+        self.next_id += 1
+        session = Session(self.next_id, connection, self.pipe_size, seed, tick_interval)
+        self.sessions[session.id] = session
+        self.schedule.setdefault(self.tick + 1, []).append(session)
+        return session
+
+    def overloaded(self):
+        """Whether a tick has overrun its budget recently."""
+        return self.last_overrun is not None and self.tick - self.last_overrun < ADMISSION_COOLDOWN
+
+    def close_session(self, session):
+        session.closed = True
+        self.sessions.pop(session.id, None)
+        if session.connection is not None:
+            session.connection.close()
+
+    def run_tick(self, now=0.0):
+        """Step every session due this tick, then send their frames."""
+        self.tick += 1
+        due = self.schedule.pop(self.tick, ())
+        live = []
+        for session in due:
+            if session.closed:
+                continue
+            session.step()
+            self.schedule.setdefault(self.tick + session.tick_interval, []).append(session)
+            live.append(session)
+
+        for session in live:
+            self.send_frame(session, now)
+
+        if self.tick % MEMORY_SAMPLE_TICKS == 0:
+            for session in list(self.sessions.values()):
+                if session.measure_memory() > MAX_SESSION_BYTES:
+                    self.close_session(session)
+        return len(live)
+
+    def send_frame(self, session, now):
+        connection = session.connection
+        if connection is None:
+            return
+        if connection.buffered() > WRITE_HIGH_WATER:
+            # The client is not keeping up: skip this frame, the next one supersedes it
+            session.frames_skipped += 1
+            if session.backed_up_since is None:
+                session.backed_up_since = now
+            elif now - session.backed_up_since > SLOW_CLIENT_TIMEOUT:
+                self.close_session(session)
+            return
+        session.backed_up_since = None
+        connection.send_frame(session.encode_frame(self.tick))
+        session.frames_sent += 1
+
+    async def run(self):
+        """Tick at FPS forever; late ticks are not caught up."""
+        loop = asyncio.get_running_loop()
+        next_time = loop.time()
+        while True:
+            self.run_tick(loop.time())
+            next_time += 1 / FPS
+            delay = next_time - loop.time()
+            if delay < 0:
+                self.overruns += 1
+                self.last_overrun = self.tick
+                next_time = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    async def handle_client(self, connection, reader):
+        session = self.open_session(connection)
+        if session is None:
+            connection.close()
+            return
+        try:
+            await connection.read_inputs(reader, session)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.close_session(session)
+
+    async def handle_websocket(self, reader, writer):
+        try:
+            if not await WebSocketConnection.handshake(reader, writer):
+                writer.close()
+                return
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        await self.handle_client(WebSocketConnection(writer), reader)
+
+    async def handle_unix(self, reader, writer):
+        await self.handle_client(UnixConnection(writer), reader)
+
+    def stats(self):
+        return {
+            'sessions': len(self.sessions),
+            'tick': self.tick,
+            'overruns': self.overruns,
+            'rejected': self.rejected,
+            'memory_bytes': sum(s.memory for s in self.sessions.values()),
+            'frames_skipped': sum(s.frames_skipped for s in self.sessions.values())
+        }
+
+
+async def serve(ws_port=None, unix_path=None, max_sessions=MAX_SESSIONS):
+    server = SessionServer(max_sessions)
+    listeners = []
+    if ws_port is not None:
+        listeners.append(await asyncio.start_server(server.handle_websocket, '0.0.0.0', ws_port))
+        print(f"WebSocket sessions on port {ws_port}")
+    if unix_path is not None:
+        listeners.append(await asyncio.start_unix_server(server.handle_unix, unix_path))
+        print(f"Unix socket sessions on {unix_path}")
+    try:
+        await server.run()
+    finally:
+        for listener in listeners:
+            listener.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Host many headless game sessions.')
+    parser.add_argument('--ws-port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', default=None)
+    parser.add_argument('--max-sessions', type=int, default=MAX_SESSIONS)
+    args = parser.parse_args()
+    asyncio.run(serve(args.ws_port, args.unix, args.max_sessions))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+# skins.py
+"""Bird, background and pipe skins from theme packs.
+
+A theme pack is a directory holding a skin.json manifest, for example:
+
+    {
+        "name": "Winter",
+        "birds": {
+            "snowy": {"label": "Snowy", "button_color": [180, 180, 220],
+                      "frames": ["snowy-down.png", "snowy-mid.png", "snowy-up.png"]}
+        },
+        "backgrounds": {"snow": {"label": "Snow", "image": "snow.png"}},
+        "pipes": {"ice": {"label": "Ice", "image": "pipe-ice.png"}}
+    }
+
+Image paths are relative to the pack. Packs are found by reading manifests
+only; a skin's images are decoded the first time it is chosen and kept in
+a size-bounded LRU cache, so installed packs cost almost nothing until used.
+"""
+import json
+import os
+from collections import OrderedDict
+
+import pygame
+from config import *
+from utils import load_scaled_image
+
+# Menu category -> manifest section
+CATEGORY_SECTIONS = {
+    'bird': 'birds',
+    'background': 'backgrounds',
+    'pipe': 'pipes'
+}
+
+# Menu category -> default skin id
+DEFAULT_SKINS = {
+    'bird': DEFAULT_SETTINGS['bird_color'],
+    'background': DEFAULT_SETTINGS['background'],
+    'pipe': DEFAULT_SETTINGS['pipe_color']
+}
+
+
+class Skin:
+    def __init__(self, category, skin_id, label, button_color, paths, pack):
+        self.category = category
+        self.id = skin_id
+        self.label = label
+        self.button_color = button_color
+        self.paths = paths
+        self.pack = pack
+
+
+class PipeSkin:
+    """A pipe image with its flipped and translucent (invincible) variants."""
+
+    def __init__(self, surface):
+        self.surface = surface
+        self.flipped = pygame.transform.flip(surface, False, True)
+        self.invincible = surface.copy()
+        self.invincible.set_alpha(128)
+        self.invincible_flipped = self.flipped.copy()
+        self.invincible_flipped.set_alpha(128)
+        self.size = surface.get_size()
+
+    def surfaces(self):
+        return [self.surface, self.flipped, self.invincible, self.invincible_flipped]
+
+
+def skin_files(category, entry):
+    """Image file names a manifest entry lists; raises ValueError if it lists none."""
+    if not isinstance(entry, dict):
+        raise ValueError("entry is not an object")
+    files = entry.get('frames') if category == 'bird' else [entry.get('image')]
+    if not files or not isinstance(files, list) or not all(isinstance(name, str) for name in files):
+        raise ValueError("no 'frames' list" if category == 'bird' else "no 'image'")
+    return files
+
+
+def surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+def decode_bird(skin):
+    return [pygame.transform.scale(pygame.image.load(path).convert_alpha(), BIRD_SIZE)
+            for path in skin.paths]
+
+
+def decode_background(skin):
+    # Parallax splits backgrounds at a fixed row and places them to cover the
+    # screen, so every background is drawn at the classic size
+    image = pygame.image.load(skin.paths[0]).convert_alpha()
+    if image.get_size() == (BACKGROUND_SIZE[0] // 2, BACKGROUND_SIZE[1] // 2):
+        return pygame.transform.scale2x(image)
+    return pygame.transform.smoothscale(image, BACKGROUND_SIZE)
+
+
+def decode_pipe(skin):
+    return PipeSkin(load_scaled_image(skin.paths[0]))
+
+
+DECODERS = {
+    'bird': decode_bird,
+    'background': decode_background,
+    'pipe': decode_pipe
+}
+
+
+def decoded_bytes(decoded):
+    if isinstance(decoded, pygame.Surface):
+        return surface_bytes(decoded)
+    if isinstance(decoded, PipeSkin):
+        decoded = decoded.surfaces()
+    return sum(surface_bytes(surface) for surface in decoded)
+
+
+class SurfaceCache:
+    """Least-recently-used cache of decoded skins, bounded by pixel bytes."""
+
+    def __init__(self, max_bytes=SKIN_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (value, size)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, size):
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key)[1]
+        self.entries[key] = (value, size)
+        self.bytes += size
+        # Always keep the newest entry, even if it alone is over budget
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+
+class SkinRegistry:
+    def __init__(self, directories=SKIN_DIRECTORIES, cache_bytes=SKIN_CACHE_BYTES):
+        self.skins = {category: OrderedDict() for category in CATEGORY_SECTIONS}
+        self.cache = SurfaceCache(cache_bytes)
+        for directory in directories:
+            self.discover(directory)
+
+    def discover(self, directory):
+        """Add the pack in directory, if any, and every pack one level below it."""
+        if not os.path.isdir(directory):
+            return
+        candidates = [directory] + sorted(
+            os.path.join(directory, name) for name in os.listdir(directory))
+        for path in candidates:
+            if os.path.isfile(os.path.join(path, SKIN_MANIFEST)):
+                self.add_pack(path)
+
+    def add_pack(self, directory):
+        manifest_path = os.path.join(directory, SKIN_MANIFEST)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Skipping skin pack {directory}: {e}")
+            return
+        if not isinstance(manifest, dict):
+            print(f"Skipping skin pack {directory}: manifest is not an object")
+            return
+
+        pack = manifest.get('name', os.path.basename(os.path.normpath(directory)))
+        for category, section in CATEGORY_SECTIONS.items():
+            entries = manifest.get(section, {})
+            if not isinstance(entries, dict):
+                print(f"Skin pack {pack}: '{section}' is not an object, skipping")
+                continue
+            for skin_id, entry in entries.items():
+                if skin_id in self.skins[category]:
+                    print(f"Skin pack {pack}: {category} '{skin_id}' already provided by "
+                          f"{self.skins[category][skin_id].pack}, skipping")
+                    continue
+                # Check entries now, so a broken one is skipped here rather
+                # than failing when it is chosen mid-game
+                try:
+                    paths = [os.path.join(directory, name) for name in skin_files(category, entry)]
+                    missing = [path for path in paths if not os.path.isfile(path)]
+                    if missing:
+                        raise ValueError(f"missing {', '.join(missing)}")
+                    button_color = tuple(entry.get('button_color', DEFAULT_BUTTON_COLOR))
+                    if len(button_color) != 3:
+                        raise ValueError("button_color is not an RGB triple")
+                except (TypeError, ValueError) as e:
+                    print(f"Skin pack {pack}: skipping {category} '{skin_id}': {e}")
+                    continue
+                self.skins[category][skin_id] = Skin(
+                    category, skin_id,
+                    entry.get('label', skin_id.title()),
+                    button_color,
+                    paths,
+                    pack
+                )
+
+    def options(self, category):
+        """Skins available in a category, in discovery order."""
+        return list(self.skins[category].values())
+
+    def get(self, category, skin_id):
+        """The skin with this id, or the category's default if it is not installed."""
+        skins = self.skins[category]
+        if skin_id in skins:
+            return skins[skin_id]
+        default = DEFAULT_SKINS[category]
+        return skins[default] if default in skins else next(iter(skins.values()))
+
+    def pipe_size(self, skin_id):
+        """Size a pipe skin decodes to, read without a display or decoding it for drawing."""
+        width, height = pygame.image.load(self.get('pipe', skin_id).paths[0]).get_size()
+        return width * 2, height * 2  # decode_pipe scales by two
+
+    def load(self, category, skin_id):
+        """Decoded images for a skin, decoding and caching them on first use.
+
+        Birds decode to a list of frames, backgrounds to a surface and pipes
+        to a PipeSkin. A skin whose images can't be decoded is dropped and the
+        category's default used instead.
+        """
+        skin = self.get(category, skin_id)
+        key = (category, skin.id)
+        decoded = self.cache.get(key)
+        if decoded is None:
+            try:
+                decoded = DECODERS[category](skin)
+            except (pygame.error, OSError) as e:
+                del self.skins[category][skin.id]
+                if not self.skins[category]:
+                    raise
+                print(f"Skin pack {skin.pack}: could not load {category} '{skin.id}' ({e}), "
+                      f"using the default")
+                return self.load(category, DEFAULT_SKINS[category])
+            self.cache.put(key, decoded, decoded_bytes(decoded))
+        return decoded
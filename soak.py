@@ -0,0 +1,321 @@
+# soak.py
+"""Soak test: run the game headlessly for hours of simulated time and check
+that memory, live objects and frame throughput stay flat.
+
+The game runs as fast as it can on a fixed course, with input posted
+through the normal event path. Input policies rotate from game to game:
+random flapping, an autopilot that flies through the gaps (scoring,
+power-ups, invincibility), and crashing (the collision, pause and fog cycle,
+then game over and reset_game). At intervals the player crashes out and,
+on the game-over screen, clicks through the customization menu to a random
+skin; every skin is decoded once beforehand so the skin cache starts full.
+
+Every sample period the process RSS, live Pipe, PowerUp, Surface and Rect
+objects, the game's own containers and the ticks per second under each
+policy are recorded. At the end each series gets a least-squares trend
+after the warm-up samples, and any that keeps growing (or, for ticks per
+second, falling) is flagged. The exit status is 1 if anything was flagged.
+
+Usage:
+    python soak.py --hours 4 --sample-every 60 --json soak.json
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+from config import *
+from utils import init_headless
+
+SAMPLE_EVERY = 60  # Simulated seconds between samples
+WARMUP_SAMPLES = 3  # Samples ignored when fitting trends (caches filling, etc.)
+TREND_TOLERANCE = 0.1  # Flag growth over the run above this fraction of the mean...
+TREND_FLOORS = {  # ...and above this absolute amount
+    'rss_kb': 2048,
+    'ticks_per_s': 500,  # Per policy; samples vary by a few hundred on a busy machine
+    'skin_cache_bytes': 4 * 1024 * 1024
+}
+DEFAULT_FLOOR = 4  # For object counts and container sizes
+COUNTED_TYPES = ('Pipe', 'PowerUp', 'Surface', 'Rect')
+POLICIES = ('random', 'autopilot', 'crash')
+SWITCH_EVERY = 45  # Simulated seconds between customization switches
+MENU_FRAMES = 30  # Frames between clicks in the customization menu
+
+
+def rss_kb():
+    """Resident set size of this process in KiB, or 0 if unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def count_objects(type_names=COUNTED_TYPES):
+    """Count live objects by type name.
+
+    pygame's Surface and Rect aren't tracked by the garbage collector, so
+    untracked objects are found through the referents of tracked ones.
+    """
+    gc.collect()
+    counts = dict.fromkeys(type_names, 0)
+    seen = set()
+    for obj in gc.get_objects():
+        for candidate in [obj] + gc.get_referents(obj):
+            name = type(candidate).__name__
+            if name in counts and id(candidate) not in seen:
+                seen.add(id(candidate))
+                counts[name] += 1
+    return counts
+
+
+def choose_flap(policy, game, rng):
+    """Whether the policy flaps this frame."""
+    state = game.state
+    if not state.game_active or state.paused:
+        # Restart or resume after a while, as a player would
+        return rng.random() < 0.05
+    if policy == 'random':
+        return rng.random() < 0.07
+    if policy == 'autopilot':
+        bird = game.bird
+        if game.unscored_pipes:
+            target = game.unscored_pipes[0].rect.top - state.current_pipe_gap // 3
+        else:
+            target = game.bird.rect.height * 8
+        return bird.rect.centery > target and bird.movement >= 0
+    return False  # crash
+
+
+def fit_trend(values):
+    """Least-squares growth over the series (slope times its length)."""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    variance = sum((x - mean_x) ** 2 for x in range(n))
+    return covariance / variance * (n - 1)
+
+
+def is_throughput(metric):
+    return metric.split('.')[0] == 'ticks_per_s'
+
+
+def find_trends(samples, warmup=WARMUP_SAMPLES):
+    """Return (metric, growth, mean) for every series trending the wrong way."""
+    samples = samples[warmup:]
+    if len(samples) < 3:
+        return []
+    flagged = []
+    for metric in samples[0]:
+        # Overall ticks/s varies with the mix of policies; each policy's is trended instead
+        if metric in ('frame', 'seconds', 'games', 'ticks_per_s'):
+            continue
+        values = [sample[metric] for sample in samples if sample.get(metric) is not None]
+        if len(values) < 3:
+            continue
+        growth = fit_trend(values)
+        mean = sum(values) / len(values)
+        third = max(len(values) // 3, 1)
+        first, last = sorted(values[:third]), sorted(values[-third:])
+        median_rise = last[len(last) // 2] - first[len(first) // 2]
+        if is_throughput(metric):
+            # Slowing down is the bad direction
+            growth, median_rise = -growth, -median_rise
+        floor = TREND_FLOORS.get(metric.split('.')[0], DEFAULT_FLOOR)
+        if growth > max(TREND_TOLERANCE * abs(mean), floor) and median_rise > 0:
+            flagged.append((metric, growth, mean))
+    return flagged
+
+
+class Soak:
+    def __init__(self, seed=0, sample_every=SAMPLE_EVERY, switch_every=SWITCH_EVERY,
+                 draw_every=1, log=None):
+        init_headless()
+        import pygame
+        from game import FlappyBird
+        from replay import Course
+
+        self.pygame = pygame
+        self.rng = random.Random(seed)
+        self.game = FlappyBird(course=Course(seed))
+        self.sample_frames = int(sample_every * FPS)
+        self.switch_frames = int(switch_every * FPS)
+        self.draw_every = draw_every
+        self.log = log or sys.stdout
+        self.devnull = open(os.devnull, 'w')
+
+        self.frame = 0
+        self.games = 0
+        self.policy = POLICIES[0]
+        self.policy_frames = dict.fromkeys(POLICIES, 0)
+        self.policy_seconds = dict.fromkeys(POLICIES, 0.0)
+        self.switch = None  # (category, skin id) to choose at the next game over
+        self.chosen = False
+        self.menu_frames_left = 0
+        self.samples = []
+
+    def post_flap(self):
+        pygame = self.pygame
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE, mod=0, unicode=' '))
+
+    def click(self, button):
+        pygame = self.pygame
+        pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=button.rect.center))
+
+    def switch_skin(self):
+        """Pick a random installed skin to choose at the next title or game-over screen."""
+        category = self.rng.choice(['bird', 'background', 'pipe'])
+        skin = self.rng.choice(self.game.skins.options(category))
+        self.switch = (category, skin.id)
+        self.chosen = False
+
+    def menu_step(self):
+        """Click through the customization menu, one click every MENU_FRAMES frames.
+
+        Opens the menu, pages the row until the skin shows, clicks it, then
+        exits. Buttons are laid out when the menu is drawn, so each click
+        waits for at least one draw.
+        """
+        if self.menu_frames_left:
+            self.menu_frames_left -= 1
+            return
+        ui = self.game.ui
+        category, skin_id = self.switch
+        if not self.game.state.show_customization:
+            if self.chosen:
+                self.switch = None
+                return
+            button = ui.customize_button
+        elif self.chosen:
+            button = ui.exit_button
+        else:
+            matches = [button for button in ui.visible_buttons(category) if button.value == skin_id]
+            button = matches[0] if matches else ui.more_buttons[category]
+            self.chosen = bool(matches)
+        self.click(button)
+        self.menu_frames_left = max(MENU_FRAMES, self.draw_every)
+
+    def visit_all_skins(self):
+        """Decode every installed skin once, so later growth isn't the cache filling."""
+        game = self.game
+        chosen = [('bird', game.state.current_bird), ('background', game.state.current_bg),
+                  ('pipe', game.state.current_pipe)]
+        with contextlib.redirect_stdout(self.devnull):
+            for category in ('bird', 'background', 'pipe'):
+                for skin in game.skins.options(category):
+                    game.apply_customization(category, skin.id)
+            for category, skin_id in chosen:
+                game.apply_customization(category, skin_id)
+
+    def step(self):
+        game = self.game
+        was_active = game.state.game_active
+        policy = self.policy
+        start = time.perf_counter()
+
+        if self.frame and self.frame % self.switch_frames == 0 and not self.switch:
+            self.switch_skin()
+        if self.switch and not game.state.game_active:
+            self.menu_step()
+        elif choose_flap('crash' if self.switch else policy, game, self.rng):
+            # Crash out to reach the menu when a switch is due
+            self.post_flap()
+
+        with contextlib.redirect_stdout(self.devnull):
+            game.handle_input()
+        game.update()
+        if self.frame % self.draw_every == 0:
+            game.draw()
+            self.pygame.display.update()
+        self.frame += 1
+        self.policy_frames[policy] += 1
+        self.policy_seconds[policy] += time.perf_counter() - start
+
+        if game.state.game_active and not was_active:
+            # reset_game ran: next game, next policy
+            self.games += 1
+            self.policy = POLICIES[self.games % len(POLICIES)]
+
+    def sample(self, elapsed):
+        game = self.game
+        sample = {
+            'frame': self.frame,
+            'seconds': self.frame / FPS,
+            'games': self.games,
+            'ticks_per_s': self.sample_frames / elapsed if elapsed else 0.0,
+            'rss_kb': rss_kb()
+        }
+        for policy in POLICIES:
+            seconds = self.policy_seconds[policy]
+            sample[f'ticks_per_s.{policy}'] = self.policy_frames[policy] / seconds if seconds else None
+        self.policy_frames = dict.fromkeys(POLICIES, 0)
+        self.policy_seconds = dict.fromkeys(POLICIES, 0.0)
+        sample.update(count_objects())
+        sample.update({
+            'pipe_list': len(game.pipe_list),
+            'power_ups': len(game.power_ups),
+            'unscored_pipes': len(game.unscored_pipes),
+            'sprites': len(game.all_sprites),
+            'subscribers': sum(len(handlers) for handlers in game.bus.subscribers.values()),
+            'skin_cache_bytes': game.skins.cache.bytes,
+            'effects': len(game.state.effects.active)
+        })
+        self.samples.append(sample)
+        print(f"[{sample['seconds'] / 3600:6.2f}h] games {self.games:5d}  "
+              f"{sample['ticks_per_s']:7.0f} ticks/s  rss {sample['rss_kb'] / 1024:6.1f}MB  "
+              + '  '.join(f"{name} {sample[name]}" for name in COUNTED_TYPES), file=self.log)
+        return sample
+
+    def run(self, hours):
+        total_frames = int(hours * 3600 * FPS)
+        self.visit_all_skins()
+        start = time.perf_counter()
+        while self.frame < total_frames:
+            self.step()
+            if self.frame % self.sample_frames == 0:
+                now = time.perf_counter()
+                self.sample(now - start)
+                start = time.perf_counter()  # Don't count sampling time
+        return find_trends(self.samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Soak-test the game for leaks and slowdowns.')
+    parser.add_argument('--hours', type=float, default=1.0, help='Simulated hours to run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sample-every', type=float, default=SAMPLE_EVERY,
+                        help='Simulated seconds between samples')
+    parser.add_argument('--switch-every', type=float, default=SWITCH_EVERY,
+                        help='Simulated seconds between customization switches')
+    parser.add_argument('--draw-every', type=int, default=1, help='Draw every Nth frame')
+    parser.add_argument('--json', metavar='PATH', help='Save the samples and flagged trends')
+    args = parser.parse_args()
+
+    soak = Soak(args.seed, args.sample_every, args.switch_every, args.draw_every)
+    flagged = soak.run(args.hours)
+
+    print(f"{soak.frame} frames, {soak.games} games, {len(soak.samples)} samples")
+    for metric, growth, mean in flagged:
+        if is_throughput(metric):
+            print(f"Slowdown: {metric} fell by {growth:.1f} over the run (mean {mean:.1f})")
+        else:
+            print(f"Upward trend: {metric} grew by {growth:.1f} over the run (mean {mean:.1f})")
+    if not flagged:
+        print("No trends flagged")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'samples': soak.samples,
+                       'flagged': [{'metric': m, 'growth': g, 'mean': a} for m, g, a in flagged]}, f)
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == '__main__':
+    main()
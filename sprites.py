@@ -3,25 +3,55 @@ import pygame
 from config import *
 
 
+def step_bird(rect, movement):
+    """Apply one frame of gravity to a bird's rect, stopping at the floor.
+
+    Returns the new vertical movement.
+    """
+    movement += GRAVITY
+    # Prevent bird from going below floor
+    new_y = rect.centery + movement
+    if new_y + rect.height/2 > FLOOR_Y_POS:
+        new_y = FLOOR_Y_POS - rect.height/2
+        movement = 0
+    rect.centery = new_y
+    return movement
+
+
+class BirdBody:
+    """A bird without images: just the rect and movement the game rules use."""
+
+    def __init__(self):
+        self.rect = pygame.Rect((0, 0), BIRD_SIZE)
+        self.rect.center = BIRD_START_POS
+        self.movement = 0
+
+    def flap(self):
+        self.movement = FLAP_STRENGTH
+
+    def update(self):
+        self.movement = step_bird(self.rect, self.movement)
+
+    def reset_position(self):
+        self.rect.center = BIRD_START_POS
+        self.movement = 0
+
+
 class Bird(pygame.sprite.Sprite):
-    def __init__(self, color):
+    def __init__(self, frames):
         super().__init__()
-        self.frames = self.load_frames(color)
+        self.frames = frames
         self.image = self.frames[0]
         self.rect = self.image.get_rect(center=(100, SCREEN_HEIGHT // 2))
         self.frame_index = 0
         self.animation_speed = 0.1
         self.movement = 0
 
-    def load_frames(self, color):
-        frames = []
-        for position in ['downflap', 'midflap', 'upflap']:
-            image_path = ASSET_PATHS['birds'][color][position]
-            # Load image and scale to specific size
-            frame = pygame.image.load(image_path).convert_alpha()
-            frame = pygame.transform.scale(frame, BIRD_SIZE)
-            frames.append(frame)
-        return frames
+    def set_frames(self, frames):
+        """Switch skins in place, keeping position, movement and animation phase."""
+        self.frames = frames
+        self.image = self.frames[int(self.frame_index) % len(self.frames)]
+        self.rect = self.image.get_rect(center=self.rect.center)
 
     def animate(self):
         self.frame_index = (self.frame_index + self.animation_speed) % len(self.frames)
@@ -33,13 +63,7 @@ class Bird(pygame.sprite.Sprite):
 
     def update(self):
         # Apply gravity
-        self.movement += GRAVITY
-        # Prevent bird from going below floor
-        new_y = self.rect.centery + self.movement
-        if new_y + self.rect.height/2 > FLOOR_Y_POS:
-            new_y = FLOOR_Y_POS - self.rect.height/2
-            self.movement = 0
-        self.rect.centery = new_y
+        self.movement = step_bird(self.rect, self.movement)
 
         # Update animation
         self.animate()
@@ -49,14 +73,78 @@ class Bird(pygame.sprite.Sprite):
         self.movement = 0
 
 
-class Floor(pygame.sprite.Sprite):
-    def __init__(self):
-        super().__init__()
-        self.image = pygame.transform.scale2x(pygame.image.load(ASSET_PATHS['base']).convert())
-        self.rect = self.image.get_rect(bottomleft=(0, SCREEN_HEIGHT+100))
-        self.x_pos = 0
+class ParallaxLayer:
+    """A horizontally scrolling strip of a tileable image.
 
-    def update(self):
-        self.x_pos -= 1
-        if self.x_pos <= -SCREEN_WIDTH:
-            self.x_pos = 0
\ No newline at end of file
+    The image is tiled once, at load time, onto a surface at least twice the
+    screen width, so any scroll offset can be drawn with one area-rect blit.
+    Scrolling only moves the area rect; nothing is allocated per frame.
+    """
+
+    def __init__(self, image, y, speed_factor):
+        self.period = image.get_width()
+        tiles = max(-(-(SCREEN_WIDTH + self.period) // self.period),
+                    -(-2 * SCREEN_WIDTH // self.period))
+        self.surface = pygame.Surface((self.period * tiles, image.get_height())).convert()
+        for i in range(tiles):
+            self.surface.blit(image, (i * self.period, 0))
+
+        self.speed_factor = speed_factor
+        self.dest = (0, y)
+        self.area = pygame.Rect(0, 0, SCREEN_WIDTH, image.get_height())
+        self.offset = 0.0
+
+    def scroll(self, distance):
+        self.offset = (self.offset + distance * self.speed_factor) % self.period
+        self.area.x = int(self.offset)
+
+    def reset(self):
+        self.offset = 0.0
+        self.area.x = 0
+
+    def draw(self, queue, layer):
+        queue.submit(self.surface, self.dest, self.area, layer)
+
+
+class Parallax:
+    """Sky, far background and floor layers scrolling at fractions of the pipe speed."""
+
+    def __init__(self, floor_image):
+        floor_y = SCREEN_HEIGHT + 100 - floor_image.get_height()
+        self.floor = ParallaxLayer(floor_image, floor_y, PARALLAX_SPEEDS['floor'])
+        self.backgrounds = ()
+        self.layers = [self.floor]
+
+    def set_background(self, image):
+        """Tile a new background, split into a sky strip and a far background strip.
+
+        Only the current background is kept tiled; the new layers carry on
+        from the old layers' scroll positions.
+        """
+        sky_height = min(PARALLAX_SKY_HEIGHT, image.get_height() - 1)
+        sky = image.subsurface((0, 0, image.get_width(), sky_height))
+        far = image.subsurface((0, sky_height, image.get_width(), image.get_height() - sky_height))
+        backgrounds = (
+            ParallaxLayer(sky, BACKGROUND_Y_POS, PARALLAX_SPEEDS['sky']),
+            ParallaxLayer(far, BACKGROUND_Y_POS + sky_height, PARALLAX_SPEEDS['far'])
+        )
+        for new, old in zip(backgrounds, self.backgrounds):
+            new.offset = old.offset % new.period
+            new.area.x = int(new.offset)
+        self.backgrounds = backgrounds
+        self.layers = list(backgrounds) + [self.floor]
+
+    def update(self, speed):
+        for layer in self.layers:
+            layer.scroll(speed)
+
+    def reset(self):
+        for layer in self.layers:
+            layer.reset()
+
+    def draw_background(self, queue, layer):
+        for background in self.backgrounds:
+            background.draw(queue, layer)
+
+    def draw_floor(self, queue, layer):
+        self.floor.draw(queue, layer)
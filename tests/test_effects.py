@@ -0,0 +1,59 @@
+# tests/test_effects.py
+"""Timed power-up effects on the EffectEngine's timer wheels."""
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import *
+from models import GameState
+
+
+class EffectEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.state = GameState()
+        self.effects = self.state.effects
+
+    def test_invincibility_lasts_three_pipes_not_three_frames(self):
+        self.effects.apply('invincible')
+        for _ in range(EFFECT_WHEEL_SIZE * 3):
+            self.effects.tick()
+        self.assertTrue(self.state.invincible)
+
+        for _ in range(PIPES_FOR_INVINCIBLE - 1):
+            self.effects.pipe_passed()
+            self.assertTrue(self.state.invincible)
+        self.effects.pipe_passed()
+        self.assertFalse(self.state.invincible)
+        self.assertFalse(self.effects.is_active('invincible'))
+
+    def test_restarted_effect_ignores_its_stale_timer(self):
+        self.effects.apply('wider_gap')
+        for _ in range(WIDER_GAP_TICKS // 2):
+            self.effects.tick()
+        self.effects.apply('wider_gap')
+
+        # The first timer's deadline passes without expiring the effect...
+        for _ in range(WIDER_GAP_TICKS - 1):
+            self.effects.tick()
+        self.assertTrue(self.state.wider_gap_effect)
+
+        # ...which lasts the full duration from the restart
+        self.effects.tick()
+        self.assertFalse(self.state.wider_gap_effect)
+
+    def test_restarted_pipe_effect_ignores_its_stale_timer(self):
+        self.effects.apply('invincible')
+        self.effects.pipe_passed()
+        self.effects.apply('invincible')
+        for _ in range(PIPES_FOR_INVINCIBLE - 1):
+            self.effects.pipe_passed()
+            self.assertTrue(self.state.invincible)
+        self.effects.pipe_passed()
+        self.assertFalse(self.state.invincible)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+# tests/test_multiplayer.py
+"""Lockstep race over localhost with a stand-in host and bot players."""
+import asyncio
+import os
+import random
+import sys
+import unittest
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # Assets are loaded relative to the repository
+
+from utils import init_headless
+init_headless()
+
+import multiplayer
+from multiplayer import (DEPARTURE, FLAP, HASH, INPUT, LEAVE, MSG_HASH, MSG_INPUT, MSG_JOIN, MSG_LEAVE,
+                         MSG_SNAPSHOT, MSG_TICKS, PLAYER_TIMEOUT, SNAPSHOT, TICKS)
+
+
+def make_bot(seed, offset):
+    """Flaps when the bird is below the next gap's top by more than offset."""
+    rng = random.Random(seed)
+
+    def bot(game):
+        gaps = [p for p in game.pipe_list if p.is_bottom and p.rect.right > game.bird.rect.left]
+        target = gaps[0].rect.top - offset if gaps else 400
+        return game.state.paused or (game.bird.rect.centery > target and game.bird.movement > 0
+                                     and rng.random() < 0.6)
+    return bot
+
+
+class Quit(Exception):
+    """Raised by a bot to walk away from the race mid-game."""
+
+
+def quit_after(ticks, bot):
+    def quitter(game):
+        if game.frame_count > ticks:
+            raise Quit
+        return bot(game)
+    return quitter
+
+
+class FakeTransport:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr=None):
+        self.sent.append((data, addr))
+
+
+class LockstepRaceTest(unittest.TestCase):
+    def test_clients_end_on_identical_worlds(self):
+        async def race():
+            loop = asyncio.get_running_loop()
+            transport, host = await loop.create_datagram_endpoint(
+                lambda: multiplayer.LockstepHost(3, seed=42), local_addr=('127.0.0.1', 0))
+            port = transport.get_extra_info('sockname')[1]
+            try:
+                return await asyncio.wait_for(asyncio.gather(*(
+                    multiplayer.play('127.0.0.1', port, headless=True, bot=make_bot(i, 40 + 15 * i))
+                    for i in range(3))), 300)
+            finally:
+                transport.close()
+
+        clients = asyncio.run(race())
+        self.assertEqual(sorted(client.player_id for client in clients), [0, 1, 2])
+        worlds = {(client.world.tick, zlib.crc32(client.world.snapshot())) for client in clients}
+        self.assertEqual(len(worlds), 1)
+        self.assertGreater(clients[0].world.tick, 0)
+        self.assertTrue(all(client.world.finished for client in clients))
+
+    def test_race_goes_on_when_a_player_quits(self):
+        async def race():
+            loop = asyncio.get_running_loop()
+            transport, host = await loop.create_datagram_endpoint(
+                lambda: multiplayer.LockstepHost(2, seed=42), local_addr=('127.0.0.1', 0))
+            port = transport.get_extra_info('sockname')[1]
+            try:
+                return await asyncio.wait_for(asyncio.gather(
+                    multiplayer.play('127.0.0.1', port, headless=True, bot=make_bot(0, 40)),
+                    multiplayer.play('127.0.0.1', port, headless=True, bot=quit_after(100, make_bot(1, 55))),
+                    return_exceptions=True), 300)
+            finally:
+                transport.close()
+
+        results = asyncio.run(race())
+        client = next(result for result in results if isinstance(result, multiplayer.LockstepClient))
+        self.assertTrue(any(isinstance(result, Quit) for result in results))
+        world = client.world
+        quitter = 1 - client.player_id
+        self.assertTrue(world.finished)
+        self.assertGreater(world.tick, client.out_at[quitter])
+        self.assertFalse(world.games[quitter].state.game_active)
+
+
+class LockstepHostTest(unittest.TestCase):
+    def setUp(self):
+        self.host = multiplayer.LockstepHost(2, seed=1)
+        self.transport = FakeTransport()
+        self.host.connection_made(self.transport)
+        self.players = [('127.0.0.1', 5000), ('127.0.0.1', 5001)]
+        for addr in self.players:
+            self.host.datagram_received(MSG_JOIN, addr)
+        self.transport.sent.clear()
+
+    def send_input(self, player, addr, flags=FLAP):
+        self.host.datagram_received(MSG_INPUT + INPUT.pack(player, 0, 0) + bytes([flags]), addr)
+
+    def decode_ticks(self, packet):
+        """(first tick, {player: tick out}, masks) from a tick packet."""
+        self.assertEqual(packet[:1], MSG_TICKS)
+        first, count = TICKS.unpack_from(packet, 1)
+        offset = 1 + TICKS.size
+        departures = dict(DEPARTURE.unpack_from(packet, offset + i * DEPARTURE.size) for i in range(count))
+        return first, departures, packet[offset + count * DEPARTURE.size:]
+
+    def test_inputs_are_relayed_once_everyone_has_sent(self):
+        self.send_input(0, self.players[0])
+        self.assertEqual(self.transport.sent, [])
+        self.send_input(1, self.players[1], 0)
+        self.assertEqual(bytes(self.host.masks), bytes([0b01]))
+
+    def test_player_ids_must_match_the_sender(self):
+        # Player 1 claims to be player 0, and an unknown host claims both ids
+        self.send_input(0, self.players[1])
+        self.send_input(0, ('127.0.0.1', 6000))
+        self.send_input(1, ('127.0.0.1', 6000))
+        self.host.datagram_received(MSG_HASH + HASH.pack(0, 120, 1), self.players[1])
+        self.host.datagram_received(MSG_LEAVE + LEAVE.pack(0), self.players[1])
+        self.assertEqual(self.host.inputs, {})
+        self.assertEqual(self.host.hashes, {})
+        self.assertEqual(self.host.departed, set())
+
+    def test_leaving_players_are_relayed_as_out(self):
+        self.send_input(0, self.players[0])
+        self.host.datagram_received(MSG_LEAVE + LEAVE.pack(1), self.players[1])
+        [(packet, addr)] = self.transport.sent
+        self.assertEqual(addr, self.players[0])
+        self.assertEqual(self.decode_ticks(packet), (0, {1: 0}, bytes([0b01])))
+
+        # Later ticks go on without waiting for them
+        self.transport.sent.clear()
+        self.host.datagram_received(MSG_INPUT + INPUT.pack(0, 1, 1) + bytes([0]), self.players[0])
+        [(packet, addr)] = self.transport.sent
+        self.assertEqual(self.decode_ticks(packet), (1, {1: 0}, bytes([0])))
+
+    def test_silent_players_time_out(self):
+        self.send_input(0, self.players[0])
+        self.assertEqual(self.transport.sent, [])
+        self.host.last_heard[1] -= PLAYER_TIMEOUT + 1
+        self.send_input(0, self.players[0])  # Player 0 resends while it waits
+        [(packet, addr)] = self.transport.sent
+        self.assertEqual(self.decode_ticks(packet), (0, {1: 0}, bytes([0b01])))
+        self.assertEqual(self.host.departed, {1})
+
+    def test_out_of_range_and_short_datagrams_are_dropped(self):
+        self.send_input(7, self.players[0])
+        for data in (MSG_INPUT, MSG_INPUT + b'\x00\x01', MSG_HASH + b'\x00', MSG_SNAPSHOT + b'\x01'):
+            self.host.datagram_received(data, self.players[0])
+        self.assertEqual(self.host.inputs, {})
+        self.assertEqual(self.transport.sent, [])
+
+    def test_only_the_authority_relays_snapshots(self):
+        snapshot = MSG_SNAPSHOT + SNAPSHOT.pack(0, 120, 0) + b'data'
+        self.host.datagram_received(snapshot, self.players[1])
+        self.assertEqual(self.transport.sent, [])
+        snapshot = MSG_SNAPSHOT + SNAPSHOT.pack(1, 120, 0) + b'data'
+        self.host.datagram_received(snapshot, self.players[0])
+        self.assertEqual(self.transport.sent, [(snapshot, self.players[1])])
+
+
+if __name__ == '__main__':
+    unittest.main()
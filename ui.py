@@ -1,19 +1,38 @@
 # ui.py
 import pygame
 from config import *
+from render import LAYER_MENU, LAYER_MENU_TEXT
 
 
 class Button:
-    def __init__(self, x, y, width, height, text, color):
+    def __init__(self, x, y, width, height, text, color, value=None):
         self.rect = pygame.Rect(x, y, width, height)
         self.text = text
+        self.value = value if value is not None else text  # Returned when clicked
         self.color = color
         self.hover = False
         self.font = pygame.font.Font(None, FONT_SIZE)
         self.active = False
         self.original_y = y  # Store original y position
+        self.surfaces = {}  # Rendered button per fill color
 
-    def draw(self, screen):
+    def render(self, color):
+        """Return the button drawn in the given fill color, rendering it once."""
+        if color not in self.surfaces:
+            surface = pygame.Surface(self.rect.size)
+            bounds = surface.get_rect()
+
+            # Draw button background
+            pygame.draw.rect(surface, color, bounds)
+            pygame.draw.rect(surface, BLACK, bounds, 2)
+
+            # Draw text
+            text_surface = self.font.render(self.text, True, WHITE)
+            surface.blit(text_surface, text_surface.get_rect(center=bounds.center))
+            self.surfaces[color] = surface
+        return self.surfaces[color]
+
+    def draw(self, queue, layer=LAYER_MENU):
         # Brighten color when hovering or active
         color = self.color
         if self.hover:
@@ -21,28 +40,26 @@ class Button:
         if self.active:
             color = tuple(min(c + 40, 255) for c in self.color)
 
-        # Draw button background
-        pygame.draw.rect(screen, color, self.rect)
-        pygame.draw.rect(screen, BLACK, self.rect, 2)
-
-        # Draw text
-        text_surface = self.font.render(self.text, True, WHITE)
-        text_rect = text_surface.get_rect(center=self.rect.center)
-        screen.blit(text_surface, text_rect)
+        queue.submit(self.render(color), self.rect, layer=layer)
 
     def handle_event(self, event):
         if event.type == pygame.MOUSEMOTION:
-            mouse_pos = pygame.mouse.get_pos()
-            self.hover = self.rect.collidepoint(mouse_pos)
+            self.hover = self.rect.collidepoint(event.pos)
         elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # Left click only
-            mouse_pos = pygame.mouse.get_pos()
-            if self.rect.collidepoint(mouse_pos):
+            if self.rect.collidepoint(event.pos):
                 return True
         return False
 
 
 class CustomizationMenu:
-    def __init__(self):
+    """Skin choices from a SkinRegistry, one row per category.
+
+    Rows with more skins than columns are paged with a "More" button.
+    """
+
+    def __init__(self, skins):
+        self.skins = skins
+        self.pages = {'bird': 0, 'background': 0, 'pipe': 0}
         self.create_buttons()
         self.font = pygame.font.Font(None, TITLE_FONT_SIZE)
         self.label_font = pygame.font.Font(None, FONT_SIZE)
@@ -52,24 +69,33 @@ class CustomizationMenu:
             'pipe': "Pipe Color:"
         }
 
+        # Static parts of the menu are rendered once
+        self.overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.overlay.fill(BLACK)
+        self.overlay.set_alpha(128)
+        self.title = self.font.render("Customization", True, WHITE)
+        self.label_surfaces = {
+            category: self.label_font.render(label_text, True, WHITE)
+            for category, label_text in self.labels.items()
+        }
+
     def create_buttons(self):
         pos = BUTTON_POSITIONS
         size = pos['button_size']
 
+        # One button per installed skin; each row shows a page of them
         self.buttons = {
-            'bird': [
-                Button(pos['column_spacing'][0], pos['bird_row'], size[0], size[1], "Yellow", (200, 200, 0)),
-                Button(pos['column_spacing'][1], pos['bird_row'], size[0], size[1], "Red", (200, 0, 0)),
-                Button(pos['column_spacing'][2], pos['bird_row'], size[0], size[1], "Blue", (0, 0, 200))
-            ],
-            'background': [
-                Button(pos['column_spacing'][0], pos['background_row'], size[0], size[1], "Day", (100, 150, 200)),
-                Button(pos['column_spacing'][1], pos['background_row'], size[0], size[1], "Night", (50, 50, 100))
-            ],
-            'pipe': [
-                Button(pos['column_spacing'][0], pos['pipe_row'], size[0], size[1], "Green", (0, 200, 0)),
-                Button(pos['column_spacing'][1], pos['pipe_row'], size[0], size[1], "Red", (200, 0, 0))
+            category: [
+                Button(0, pos[f'{category}_row'], size[0], size[1], skin.label, skin.button_color, skin.id)
+                for skin in self.skins.options(category)
             ]
+            for category in self.pages
+        }
+        more_x = pos['column_spacing'][-1] + size[0] + 10
+        self.more_buttons = {
+            category: Button(more_x, pos[f'{category}_row'], 60, size[1], "More", (100, 100, 100))
+            for category, buttons in self.buttons.items()
+            if len(buttons) > len(pos['column_spacing'])
         }
 
         self.customize_button = Button(
@@ -87,61 +113,74 @@ class CustomizationMenu:
 
     def update_active_buttons(self, game_state):
         """Update which buttons should be shown as active based on current game state"""
+        chosen = {
+            'bird': game_state.current_bird,
+            'background': game_state.current_bg,
+            'pipe': game_state.current_pipe
+        }
         for category, buttons in self.buttons.items():
             for button in buttons:
-                if category == 'bird':
-                    button.active = button.text.lower() == game_state.current_bird
-                elif category == 'background':
-                    button.active = button.text.lower() == game_state.current_bg
-                elif category == 'pipe':
-                    button.active = button.text.lower() == game_state.current_pipe
-
-    def draw(self, screen, game_state=None):
+                button.active = button.value == chosen[category]
+
+    def visible_buttons(self, category):
+        """The buttons on the category's current page."""
+        columns = len(BUTTON_POSITIONS['column_spacing'])
+        start = self.pages[category] * columns
+        return self.buttons[category][start:start + columns]
+
+    def draw(self, queue, game_state=None):
         if game_state:
             self.update_active_buttons(game_state)
 
         # Draw semi-transparent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.fill(BLACK)
-        overlay.set_alpha(128)
-        screen.blit(overlay, (0, 0))
+        queue.submit(self.overlay, (0, 0), layer=LAYER_MENU)
 
         # Draw title with more space at the top
-        title = self.font.render("Customization", True, WHITE)
-        title_rect = title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 400))
-        screen.blit(title, title_rect)
+        title_rect = self.title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 400))
+        queue.submit(self.title, title_rect, layer=LAYER_MENU_TEXT)
 
         # Draw exit button
-        self.exit_button.draw(screen)
+        self.exit_button.draw(queue, LAYER_MENU_TEXT)
 
         # Draw category labels and buttons with proper spacing
         starting_y = SCREEN_HEIGHT - 350  # Start labels lower to avoid overlap with title
         spacing = 80  # Increased spacing between categories
 
-        for i, (category, label_text) in enumerate(self.labels.items()):
+        for i, category in enumerate(self.labels):
             # Calculate y position for this category
             current_y = starting_y + (i * spacing)
 
             # Draw label
-            text = self.label_font.render(label_text, True, WHITE)
-            screen.blit(text, (10, current_y))
+            queue.submit(self.label_surfaces[category], (10, current_y), layer=LAYER_MENU_TEXT)
 
             # Update button positions
-            for j, button in enumerate(self.buttons[category]):
+            for j, button in enumerate(self.visible_buttons(category)):
                 button.rect.y = current_y + 30  # Position buttons below their labels
                 button.rect.x = BUTTON_POSITIONS['column_spacing'][j]  # Keep existing x positions
-                button.draw(screen)
+                button.draw(queue, LAYER_MENU_TEXT)
+            if category in self.more_buttons:
+                more = self.more_buttons[category]
+                more.rect.y = current_y + 30
+                more.draw(queue, LAYER_MENU_TEXT)
 
     def handle_events(self, event):
         # Handle exit button
         if self.exit_button.handle_event(event):
             return 'exit', None
 
+        # Page through rows with more skins than columns
+        columns = len(BUTTON_POSITIONS['column_spacing'])
+        for category, more in self.more_buttons.items():
+            if more.handle_event(event):
+                pages = -(-len(self.buttons[category]) // columns)
+                self.pages[category] = (self.pages[category] + 1) % pages
+                return None, None
+
         # Handle option buttons
-        for category, button_list in self.buttons.items():
-            for button in button_list:
+        for category in self.buttons:
+            for button in self.visible_buttons(category):
                 if button.handle_event(event):
                     print(f"Button clicked: {category} - {button.text}")  # Debug print
-                    return category, button.text
+                    return category, button.value
 
         return None, None
@@ -1,6 +1,17 @@
 # utils.py
+import os
 import pygame
 from config import *
+from render import LAYER_HUD
+
+
+def init_headless():
+    """Use SDL's dummy video/audio drivers so the game can run without a window.
+
+    Must be called before FlappyBird() initialises pygame.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
 
 
 def load_scaled_image(path):
@@ -8,32 +19,53 @@ def load_scaled_image(path):
     return pygame.transform.scale2x(pygame.image.load(path).convert_alpha())
 
 
-def draw_heart(screen, x, y, scale=15):
-    """Draw a heart shape."""
-    color = RED
+_heart_surfaces = {}
+
+
+def heart_surface(scale=15):
+    """Return a cached surface with a heart shape, centred on (scale, scale)."""
+    if scale not in _heart_surfaces:
+        color = RED
+        surface = pygame.Surface((scale * 2 + 1, scale * 2 + 1), pygame.SRCALPHA)
+        x, y = scale, scale
 
-    # Draw the two circles for the top of the heart
-    pygame.draw.circle(screen, color, (int(x - scale / 2), int(y - scale / 4)), int(scale / 2))
-    pygame.draw.circle(screen, color, (int(x + scale / 2), int(y - scale / 4)), int(scale / 2))
+        # Draw the two circles for the top of the heart
+        pygame.draw.circle(surface, color, (int(x - scale / 2), int(y - scale / 4)), int(scale / 2))
+        pygame.draw.circle(surface, color, (int(x + scale / 2), int(y - scale / 4)), int(scale / 2))
 
-    # Draw the bottom triangle of the heart
-    points = [
-        (x - scale, y - scale / 4),  # Left point
-        (x + scale, y - scale / 4),  # Right point
-        (x, y + scale)  # Bottom point
-    ]
-    pygame.draw.polygon(screen, color, points)
+        # Draw the bottom triangle of the heart
+        points = [
+            (x - scale, y - scale / 4),  # Left point
+            (x + scale, y - scale / 4),  # Right point
+            (x, y + scale)  # Bottom point
+        ]
+        pygame.draw.polygon(surface, color, points)
+        _heart_surfaces[scale] = surface
+    return _heart_surfaces[scale]
 
 
-def draw_score(screen, score, number_images):
-    """Draw the score using number images."""
+def draw_heart(queue, x, y, scale=15, layer=LAYER_HUD):
+    """Queue a heart shape centred on (x, y)."""
+    queue.submit(heart_surface(scale), (int(x - scale), int(y - scale)), layer=layer)
+
+
+def layout_score(score, number_images):
+    """Return (image, position) pairs for the score's digits, centred on screen."""
     score_str = str(score)
     total_width = sum(number_images[int(digit)].get_width() for digit in score_str)
     x_pos = (SCREEN_WIDTH - total_width) // 2
 
+    layout = []
     for digit in score_str:
-        screen.blit(number_images[int(digit)], (x_pos, 100))
+        layout.append((number_images[int(digit)], (x_pos, SCORE_Y_POS)))
         x_pos += number_images[int(digit)].get_width()
+    return layout
+
+
+def draw_score(queue, score, number_images, layer=LAYER_HUD):
+    """Queue the score using number images."""
+    for image, position in layout_score(score, number_images):
+        queue.submit(image, position, layer=layer)
 
 
 def draw_fog_effect(screen):